@@ -1,13 +1,13 @@
 import streamlit as st
+import threading
+from bisect import bisect_right
 import time
-import json
-from datetime import datetime
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from modules.vector_store import VectorStore
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from modules.vector_store import create_vector_store, load_faiss_index
 from modules.sentiment_analysis import SentimentAnalyzer
-from modules.escalation_predictor import EscalationPredictor
+from modules.escalation_predictor import CONTEXT_MESSAGES, EscalationPredictor, ConversationFeatureTracker
 from modules.response_generator import ResponseGenerator
 from modules.knowledge_processor import KnowledgeProcessor
 from modules.evaluation import RAGEvaluator
@@ -29,16 +29,34 @@ if 'message_counter' not in st.session_state:
 if 'satisfaction_tracker' not in st.session_state:
     st.session_state.satisfaction_tracker = CustomerSatisfactionTracker()
 
+def new_conversation_stats():
+    """Running aggregates and chart columns, updated as messages are appended"""
+    return {
+        'customer_count': 0,
+        'sentiment_sum': 0.0,
+        'agent_count': 0,
+        'response_time_sum': 0.0,
+        'sentiment_message': [],
+        'sentiment_score': [],
+        'sentiment_label': [],
+        'response_times': []
+    }
+
+if 'conversation_stats' not in st.session_state:
+    st.session_state.conversation_stats = new_conversation_stats()
+if 'escalation_features' not in st.session_state:
+    st.session_state.escalation_features = ConversationFeatureTracker()
+
 # Initialize components
 @st.cache_resource
 def initialize_components():
     """Initialize all system components"""
     try:
-        vector_store = VectorStore()
-        sentiment_analyzer = SentimentAnalyzer()
+        vector_store = create_vector_store()
+        sentiment_analyzer = SentimentAnalyzer(vector_store)
         escalation_predictor = EscalationPredictor()
         response_generator = ResponseGenerator()
-        knowledge_processor = KnowledgeProcessor()
+        knowledge_processor = KnowledgeProcessor(vector_store)
         evaluator = RAGEvaluator()
         satisfaction_tracker = st.session_state.satisfaction_tracker
         return {
@@ -54,6 +72,45 @@ def initialize_components():
         st.error(f"Failed to initialize components: {str(e)}")
         return None
 
+# Chat messages rendered before older ones are collapsed behind a toggle
+RECENT_MESSAGES = 20
+
+# Background work that shouldn't block rendering (response evaluation)
+_background = ThreadPoolExecutor(max_workers=2)
+
+# Independent model calls made while handling a message (sentiment, escalation, retrieval)
+_requests = ThreadPoolExecutor(max_workers=4)
+
+def submit_in_context(fn, *args, executor=_requests):
+    """Run fn on a pool (the request pool by default) with the current script run context so its st.* messages still render"""
+    ctx = get_script_run_ctx()
+
+    def run():
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, ctx)
+        try:
+            return fn(*args)
+        finally:
+            add_script_run_ctx(thread, None)
+
+    return executor.submit(run)
+
+# Memoized model calls (leading-underscore args are excluded from the cache key)
+@st.cache_data(ttl=3600, max_entries=2048, show_spinner=False)
+def _cached_sentiment(_analyzer, text):
+    """Sentiment analysis keyed on the raw message text"""
+    return _analyzer.analyze_sentiment(text)
+
+@st.cache_data(ttl=3600, max_entries=2048, show_spinner=False)
+def _cached_evaluation(_evaluator, query, response, doc_ids, _docs):
+    """Response evaluation keyed on (query, response, retrieved doc ids)"""
+    return _evaluator.evaluate_response(query, response, _docs)
+
+@st.cache_data(ttl=600, max_entries=4096, show_spinner=False)
+def _cached_search(_vector_store, query, k):
+    """Similarity search keyed on (query, k); saves the embedding call and index round-trip"""
+    return _vector_store.similarity_search(query, k=k)
+
 def main():
     st.set_page_config(
         page_title="Customer Support RAG System",
@@ -71,205 +128,298 @@ def main():
         st.error("System initialization failed. Please check your API keys and try again.")
         return
     
-    # Sidebar for system status and metrics
+    # Sidebar for system status and metrics (refreshes on its own widgets or every 30s)
     with st.sidebar:
-        st.header("📊 System Status")
-        
-        # System health check
-        with st.spinner("Checking system health..."):
-            health_status = check_system_health(components)
-            
-        if health_status['all_healthy']:
-            st.success("✅ All systems operational")
-        else:
-            st.warning("⚠️ Some systems need attention")
-            for service, status in health_status.items():
-                if service != 'all_healthy' and not status:
-                    st.error(f"❌ {service}")
-        
-        st.divider()
-        
-        # Customer information
-        st.header("👤 Customer Info")
-        st.write(f"**Customer ID:** {st.session_state.customer_id}")
-        st.write(f"**Session Started:** {format_timestamp(time.time())}")
-        
-        # Conversation metrics
-        if st.session_state.conversation_history:
-            st.metric("Messages", len(st.session_state.conversation_history))
-            
-            # Calculate average sentiment
-            sentiments = [msg.get('sentiment_score', 0.5) for msg in st.session_state.conversation_history if msg['sender'] == 'customer']
-            if sentiments:
-                avg_sentiment = sum(sentiments) / len(sentiments)
-                st.metric("Avg Sentiment", f"{avg_sentiment:.2f}")
-
-            avg_sat = st.session_state.satisfaction_tracker.average_rating()
-            if avg_sat is not None:
-                st.metric("Avg Satisfaction", f"{avg_sat:.2f}/5")
-        
-        st.divider()
-        
-        # Knowledge base management
-        st.header("📚 Knowledge Base")
-        if st.button("🔄 Reload Knowledge Base"):
-            with st.spinner("Reloading knowledge base..."):
-                success = components['knowledge_processor'].load_knowledge_base()
-                if success:
-                    st.success("Knowledge base reloaded successfully!")
-                else:
-                    st.error("Failed to reload knowledge base")
-        
-        # Clear conversation
-        if st.button("🗑️ Clear Conversation"):
-            st.session_state.conversation_history = []
-            st.session_state.escalation_alerts = []
-            st.rerun()
+        sidebar_panel(components)
     
     # Main chat interface
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.header("💬 Customer Support Chat")
-        
-        # Display conversation history
-        chat_container = st.container()
-        with chat_container:
-            for msg in st.session_state.conversation_history:
-                if msg['sender'] == 'customer':
-                    with st.chat_message("user"):
-                        st.write(msg['content'])
-                        
-                        # Show sentiment and escalation info
-                        if 'sentiment_score' in msg:
-                            sentiment_color = get_sentiment_color(msg['sentiment_score'])
-                            st.caption(f"Sentiment: {msg['sentiment_label']} ({msg['sentiment_score']:.2f})")
-                            
-                        if msg.get('escalation_risk', 0) > config.ESCALATION_THRESHOLD:
-                            st.warning(f"⚠️ Escalation Risk: {msg['escalation_risk']:.2f}")
-                
-                elif msg['sender'] == 'agent':
-                    with st.chat_message("assistant"):
-                        st.write(msg['content'])
-                        
-                        # Show response metadata
-                        if 'response_time' in msg:
-                            st.caption(f"Response time: {msg['response_time']:.2f}s | Tone: {msg.get('tone', 'neutral')}")
-                        # Retrieval transparency (titles + scores)
-                        if msg.get('retrieval_context'):
-                            with st.expander("Retrieved context"):
-                                for i, meta in enumerate(msg['retrieval_context']):
-                                    st.write(f"{i+1}. {meta['title']} (score: {meta['score']}, category: {meta['category']})")
-        
-        # Satisfaction feedback (rate last agent response)
-        if st.session_state.conversation_history:
-            last_msg = st.session_state.conversation_history[-1]
-            if last_msg['sender'] == 'agent' and not last_msg.get('rated'):
-                with st.expander("💡 Rate the last response"):
-                    with st.form(f"feedback_form_{last_msg.get('id','last')}"):
-                        rating = st.slider("Your satisfaction (1 = poor, 5 = excellent)", 1, 5, 4, key=f"rating_{last_msg.get('id')}")
-                        comment = st.text_input("Optional feedback", key=f"comment_{last_msg.get('id')}")
-                        submitted = st.form_submit_button("Submit Feedback")
-                        if submitted:
-                            last_msg['rated'] = True
-                            last_msg['satisfaction_rating'] = rating
-                            st.session_state.satisfaction_tracker.add_feedback(last_msg.get('id','last'), rating, comment)
-                            st.success("Feedback recorded. Thank you!")
-                            st.rerun()
-
-        # Customer input
-        customer_message = st.chat_input("Type your message here...")
-        if customer_message:
-            process_customer_message(customer_message, components)
+        chat_panel(components)
     
     with col2:
-        st.header("📈 Analytics Dashboard")
-        
-        # Escalation alerts
-        if st.session_state.escalation_alerts:
-            st.subheader("🚨 Escalation Alerts")
-            for alert in st.session_state.escalation_alerts[-3:]:  # Show last 3 alerts
-                st.error(f"⚠️ {alert['message']} (Risk: {alert['risk']:.2f})")
-        
-        # Sentiment trend
-        if len(st.session_state.conversation_history) > 1:
-            st.subheader("😊 Sentiment Trend")
-            sentiment_data = []
-            for i, msg in enumerate(st.session_state.conversation_history):
-                if msg['sender'] == 'customer' and 'sentiment_score' in msg:
-                    sentiment_data.append({
-                        'Message': i + 1,
-                        'Sentiment': msg['sentiment_score'],
-                        'Label': msg['sentiment_label']
-                    })
-            
-            if sentiment_data:
-                df = pd.DataFrame(sentiment_data)
-                fig = px.line(df, x='Message', y='Sentiment', 
-                            title="Customer Sentiment Over Time",
-                            range_y=[0, 1])
-                fig.add_hline(y=0.5, line_dash="dash", line_color="gray", 
-                            annotation_text="Neutral")
-                fig.add_hline(y=config.ESCALATION_THRESHOLD, line_dash="dash", 
-                            line_color="red", annotation_text="Escalation Threshold")
-                st.plotly_chart(fig, use_container_width=True)
-        
-        # System performance metrics
-        st.subheader("⚡ Performance Metrics")
-        if st.session_state.conversation_history:
-            response_times = [msg.get('response_time', 0) for msg in st.session_state.conversation_history if msg['sender'] == 'agent']
-            if response_times:
-                avg_response_time = sum(response_times) / len(response_times)
-                st.metric("Avg Response Time", f"{avg_response_time:.2f}s")
-                
-                # Response time distribution
-                fig = px.histogram(response_times, title="Response Time Distribution")
-                st.plotly_chart(fig, use_container_width=True)
-
-        # Customer satisfaction metrics
-        st.subheader("🙂 Satisfaction Metrics")
-        tracker = st.session_state.satisfaction_tracker
-        avg_rating = tracker.average_rating()
-        if avg_rating is not None:
-            st.metric("Average Rating", f"{avg_rating:.2f}/5")
-            trend = tracker.rating_trend()
-            st.caption(f"Trend: {trend}")
-        else:
-            st.caption("No satisfaction feedback yet.")
-
-def check_system_health(components):
-    """Check health status of all system components"""
+        analytics_panel()
+
+def render_message(msg):
+    """Render one conversation message as a chat bubble"""
+    if msg['sender'] == 'customer':
+        with st.chat_message("user"):
+            st.write(msg['content'])
+
+            # Show sentiment and escalation info
+            if 'sentiment_score' in msg:
+                sentiment_color = get_sentiment_color(msg['sentiment_score'])
+                st.caption(f"Sentiment: {msg['sentiment_label']} ({msg['sentiment_score']:.2f})")
+
+            if msg.get('escalation_risk', 0) > config.ESCALATION_THRESHOLD:
+                st.warning(f"⚠️ Escalation Risk: {msg['escalation_risk']:.2f}")
+
+    elif msg['sender'] == 'agent':
+        with st.chat_message("assistant"):
+            st.write(msg['content'])
+
+            # Show response metadata
+            if 'response_time' in msg:
+                st.caption(f"Response time: {msg['response_time']:.2f}s | Tone: {msg.get('tone', 'neutral')}")
+            # Retrieval transparency (titles + scores)
+            if msg.get('retrieval_context'):
+                with st.expander("Retrieved context"):
+                    for i, meta in enumerate(msg['retrieval_context']):
+                        st.write(f"{i+1}. {meta['title']} (score: {meta['score']}, category: {meta['category']})")
+
+# Each panel is a fragment so interacting with one doesn't re-run the others
+@st.fragment(run_every="30s")
+def sidebar_panel(components):
+    """System status, customer info and knowledge base controls"""
+    st.header("📊 System Status")
+
+    # System health check
+    with st.spinner("Checking system health..."):
+        health_status = check_system_health(components)
+
+    if health_status['all_healthy']:
+        st.success("✅ All systems operational")
+    else:
+        st.warning("⚠️ Some systems need attention")
+        for service, status in health_status.items():
+            if service != 'all_healthy' and not status:
+                st.error(f"❌ {service}")
+
+    st.divider()
+
+    # Customer information
+    st.header("👤 Customer Info")
+    st.write(f"**Customer ID:** {st.session_state.customer_id}")
+    st.write(f"**Session Started:** {format_timestamp(time.time())}")
+
+    # Conversation metrics
+    if st.session_state.conversation_history:
+        st.metric("Messages", len(st.session_state.conversation_history))
+
+        # Average sentiment from running totals
+        stats = st.session_state.conversation_stats
+        if stats['customer_count']:
+            avg_sentiment = stats['sentiment_sum'] / stats['customer_count']
+            st.metric("Avg Sentiment", f"{avg_sentiment:.2f}")
+
+        avg_sat = st.session_state.satisfaction_tracker.average_rating()
+        if avg_sat is not None:
+            st.metric("Avg Satisfaction", f"{avg_sat:.2f}/5")
+
+    st.divider()
+
+    # Knowledge base management
+    st.header("📚 Knowledge Base")
+    if st.button("🔄 Reload Knowledge Base"):
+        with st.spinner("Reloading knowledge base..."):
+            # Drop the cached on-disk FAISS index; the store itself (and the
+            # other components) stay alive and are re-seeded in place
+            load_faiss_index.clear()
+            success = components['knowledge_processor'].load_knowledge_base(
+                vector_store=components['vector_store']
+            )
+            if success:
+                st.success("Knowledge base reloaded successfully!")
+            else:
+                st.error("Failed to reload knowledge base")
+
+    # Clear conversation
+    if st.button("🗑️ Clear Conversation"):
+        st.session_state.conversation_history = []
+        st.session_state.conversation_stats = new_conversation_stats()
+        st.session_state.escalation_features = ConversationFeatureTracker()
+        st.session_state.escalation_alerts = []
+        st.rerun()
+
+@st.fragment
+def chat_panel(components):
+    """Conversation view, feedback form and message input"""
+    st.header("💬 Customer Support Chat")
+
+    # Display conversation history: only the recent tail is rendered by default
+    history = st.session_state.conversation_history
+    older_count = max(0, len(history) - RECENT_MESSAGES)
+    chat_container = st.container()
+    with chat_container:
+        if older_count and st.toggle(f"Show earlier {older_count} messages", key="show_older_messages"):
+            for msg in history[:older_count]:
+                render_message(msg)
+        for msg in history[older_count:]:
+            render_message(msg)
+
+    # Satisfaction feedback (rate last agent response)
+    if st.session_state.conversation_history:
+        last_msg = st.session_state.conversation_history[-1]
+        if last_msg['sender'] == 'agent' and not last_msg.get('rated'):
+            with st.expander("💡 Rate the last response"):
+                with st.form(f"feedback_form_{last_msg.get('id','last')}"):
+                    rating = st.slider("Your satisfaction (1 = poor, 5 = excellent)", 1, 5, 4, key=f"rating_{last_msg.get('id')}")
+                    comment = st.text_input("Optional feedback", key=f"comment_{last_msg.get('id')}")
+                    submitted = st.form_submit_button("Submit Feedback")
+                    if submitted:
+                        last_msg['rated'] = True
+                        last_msg['satisfaction_rating'] = rating
+                        st.session_state.satisfaction_tracker.add_feedback(last_msg.get('id','last'), rating, comment)
+                        st.success("Feedback recorded. Thank you!")
+                        st.rerun()
+
+    # Customer input
+    customer_message = st.chat_input("Type your message here...")
+    if customer_message:
+        process_customer_message(customer_message, components)
+
+@st.fragment(run_every="10s")
+def analytics_panel():
+    """Escalation alerts, sentiment trend, performance and satisfaction metrics"""
+    st.header("📈 Analytics Dashboard")
+
+    # Escalation alerts
+    if st.session_state.escalation_alerts:
+        st.subheader("🚨 Escalation Alerts")
+        for alert in st.session_state.escalation_alerts[-3:]:  # Show last 3 alerts
+            st.error(f"⚠️ {alert['message']} (Risk: {alert['risk']:.2f})")
+
+    # Sentiment trend
+    if len(st.session_state.conversation_history) > 1:
+        st.subheader("😊 Sentiment Trend")
+        stats = st.session_state.conversation_stats
+        if stats['sentiment_score']:
+            fig = build_sentiment_fig(
+                tuple(stats['sentiment_message']),
+                tuple(stats['sentiment_score']),
+                tuple(stats['sentiment_label'])
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    # System performance metrics
+    st.subheader("⚡ Performance Metrics")
+    if st.session_state.conversation_history:
+        stats = st.session_state.conversation_stats
+        response_times = stats['response_times']
+        if stats['agent_count']:
+            avg_response_time = stats['response_time_sum'] / stats['agent_count']
+            st.metric("Avg Response Time", f"{avg_response_time:.2f}s")
+
+            # Response time distribution
+            fig = build_response_hist(tuple(response_times))
+            st.plotly_chart(fig, use_container_width=True)
+
+    # Customer satisfaction metrics
+    st.subheader("🙂 Satisfaction Metrics")
+    tracker = st.session_state.satisfaction_tracker
+    avg_rating = tracker.average_rating()
+    if avg_rating is not None:
+        st.metric("Average Rating", f"{avg_rating:.2f}/5")
+        trend = tracker.rating_trend()
+        st.caption(f"Trend: {trend}")
+    else:
+        st.caption("No satisfaction feedback yet.")
+
+# Figures are cached on their (hashable) input series, so reruns that don't
+# change the conversation skip Plotly figure construction
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_sentiment_fig(messages, scores, labels):
+    """Sentiment-over-time line chart"""
+    import pandas as pd
+    import plotly.express as px
+
+    df = pd.DataFrame({
+        'Message': messages,
+        'Sentiment': scores,
+        'Label': labels
+    })
+    fig = px.line(df, x='Message', y='Sentiment', 
+                title="Customer Sentiment Over Time",
+                range_y=[0, 1])
+    fig.add_hline(y=0.5, line_dash="dash", line_color="gray", 
+                annotation_text="Neutral")
+    fig.add_hline(y=config.ESCALATION_THRESHOLD, line_dash="dash", 
+                line_color="red", annotation_text="Escalation Threshold")
+    return fig
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_response_hist(response_times):
+    """Response time distribution histogram"""
+    import plotly.express as px
+
+    return px.histogram(list(response_times), title="Response Time Distribution")
+
+@st.cache_data(ttl=30, show_spinner=False)
+def check_system_health(_components):
+    """Check health status of all system components (re-probed at most every 30s)"""
     health_status = {}
     
     try:
         # Check vector store
-        health_status['vector_store'] = components['vector_store'].is_healthy()
+        health_status['vector_store'] = _components['vector_store'].is_healthy()
     except:
         health_status['vector_store'] = False
     
     try:
         # Check sentiment analyzer
-        health_status['sentiment_analyzer'] = components['sentiment_analyzer'].is_healthy()
+        health_status['sentiment_analyzer'] = _components['sentiment_analyzer'].is_healthy()
     except:
         health_status['sentiment_analyzer'] = False
     
     try:
         # Check response generator
-        health_status['response_generator'] = components['response_generator'].is_healthy()
+        health_status['response_generator'] = _components['response_generator'].is_healthy()
     except:
         health_status['response_generator'] = False
     
     health_status['all_healthy'] = all(health_status.values())
     return health_status
 
+# Sentiment color bands: [0, 0.3) red, [0.3, 0.7) orange, [0.7, 1] green
+_SENTIMENT_COLOR_BOUNDS = (0.3, 0.7)
+_SENTIMENT_COLORS = ("red", "orange", "green")
+
 def get_sentiment_color(sentiment_score):
     """Get color based on sentiment score"""
-    if sentiment_score < 0.3:
-        return "red"
-    elif sentiment_score < 0.7:
-        return "orange"
-    else:
-        return "green"
+    return _SENTIMENT_COLORS[bisect_right(_SENTIMENT_COLOR_BOUNDS, sentiment_score)]
+
+def append_message(msg):
+    """Append a message to the conversation and update the running aggregates"""
+    history = st.session_state.conversation_history
+    history.append(msg)
+    st.session_state.escalation_features.update(msg)
+    stats = st.session_state.conversation_stats
+    if msg['sender'] == 'customer':
+        stats['customer_count'] += 1
+        stats['sentiment_sum'] += msg.get('sentiment_score', 0.5)
+        if 'sentiment_score' in msg:
+            stats['sentiment_message'].append(len(history))
+            stats['sentiment_score'].append(msg['sentiment_score'])
+            stats['sentiment_label'].append(msg['sentiment_label'])
+    elif msg['sender'] == 'agent':
+        response_time = msg.get('response_time', 0)
+        stats['agent_count'] += 1
+        stats['response_time_sum'] += response_time
+        stats['response_times'].append(response_time)
+
+def evaluate_in_background(components, agent_msg, message, retrieved_docs):
+    """Score an agent response and attach the metrics to its message"""
+    try:
+        doc_ids = tuple(d.get('id', '') for d in retrieved_docs)
+        evaluation_metrics = _cached_evaluation(
+            components['evaluator'], message, agent_msg['content'], doc_ids, retrieved_docs
+        )
+        if 'error' in evaluation_metrics:
+            _cached_evaluation.clear(
+                components['evaluator'], message, agent_msg['content'], doc_ids, retrieved_docs
+            )
+        agent_msg['evaluation'] = evaluation_metrics
+    except Exception as e:
+        st.warning(f"Response evaluation failed: {str(e)}")
+
+def rerun_chat():
+    """Re-render only the chat panel when in a fragment rerun; the dashboard picks up changes on its own refresh"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # Full-script run (e.g. first render), so a fragment-scoped rerun isn't allowed
+        st.rerun()
 
 def process_customer_message(message, components):
     """Process incoming customer message and generate response"""
@@ -283,14 +433,32 @@ def process_customer_message(message, components):
     }
     
     try:
-        # Analyze sentiment
-        sentiment_result = components['sentiment_analyzer'].analyze_sentiment(message)
-        customer_msg.update(sentiment_result)
-        
-        # Predict escalation risk
-        escalation_risk = components['escalation_predictor'].predict_escalation(
-            message, st.session_state.conversation_history
+        # Sentiment, escalation risk and retrieval only depend on the message,
+        # so they run concurrently
+        sentiment_future = submit_in_context(_cached_sentiment, components['sentiment_analyzer'], message)
+        # With tracker features the predictor only reads the latest messages, so the
+        # worker gets a short tail instead of a copy of the whole history
+        escalation_future = submit_in_context(
+            components['escalation_predictor'].predict_escalation,
+            message, st.session_state.conversation_history[-CONTEXT_MESSAGES:],
+            st.session_state.escalation_features.features()
         )
+        search_future = submit_in_context(_cached_search, components['vector_store'], message, 3)
+        
+        with st.chat_message("user"):
+            st.write(message)
+        
+        with st.spinner("Analyzing message and searching knowledge base..."):
+            sentiment_result = sentiment_future.result()
+            escalation_risk = escalation_future.result()
+            retrieved_docs = search_future.result()
+        
+        if 'analysis_failed' in sentiment_result.get('indicators', []):
+            # Don't pin a fallback result for the whole TTL
+            _cached_sentiment.clear(components['sentiment_analyzer'], message)
+        if any(d.get('id', '').startswith('fallback_') for d in retrieved_docs):
+            _cached_search.clear(components['vector_store'], message, 3)
+        customer_msg.update(sentiment_result)
         customer_msg['escalation_risk'] = escalation_risk
         
         # Check for escalation
@@ -302,57 +470,52 @@ def process_customer_message(message, components):
             }
             st.session_state.escalation_alerts.append(alert)
         
-        st.session_state.conversation_history.append(customer_msg)
+        append_message(customer_msg)
         
-        # Generate response
-        with st.spinner("Generating response..."):
-            # Retrieve relevant knowledge
-            retrieved_docs = components['vector_store'].similarity_search(message, k=3)
-            
-            # Generate empathetic response
-            satisfaction_avg = st.session_state.satisfaction_tracker.average_rating() or 4.0
-            response_data = components['response_generator'].generate_response(
-                message,
-                retrieved_docs,
-                st.session_state.conversation_history,
-                sentiment_result,
-                satisfaction_avg
-            )
-            
-            response_time = time.time() - start_time
-            
-            # Add agent response to history
-            st.session_state.message_counter += 1
-            agent_msg = {
-                'id': f"m_{st.session_state.message_counter}",
-                'sender': 'agent',
-                'content': response_data['response'],
-                'timestamp': time.time(),
-                'response_time': response_time,
-                'tone': response_data.get('tone', 'neutral'),
-                'retrieved_docs': len(retrieved_docs),
-                'retrieval_context': [
-                    {
-                        'title': d.get('title',''),
-                        'score': round(float(d.get('score', 0.0)), 4) if isinstance(d.get('score', 0.0), (int, float)) else 0.0,
-                        'category': d.get('category','general')
-                    } for d in retrieved_docs
-                ],
-                'rated': False
-            }
-            
-            st.session_state.conversation_history.append(agent_msg)
-            
-            # Evaluate response quality
-            try:
-                evaluation_metrics = components['evaluator'].evaluate_response(
-                    message, response_data['response'], retrieved_docs
-                )
-                agent_msg['evaluation'] = evaluation_metrics
-            except Exception as e:
-                st.warning(f"Response evaluation failed: {str(e)}")
+        # Generate empathetic response, streamed into the chat as tokens arrive
+        satisfaction_avg = st.session_state.satisfaction_tracker.average_rating() or 4.0
+        response_data = components['response_generator'].generate_response(
+            message,
+            retrieved_docs,
+            st.session_state.conversation_history,
+            sentiment_result,
+            satisfaction_avg,
+            stream=True
+        )
+        with st.chat_message("assistant"):
+            response_text = st.write_stream(response_data['response'])
+        if not isinstance(response_text, str):
+            response_text = "".join(str(part) for part in response_text)
         
-        st.rerun()
+        response_time = time.time() - start_time
+        
+        # Add agent response to history
+        st.session_state.message_counter += 1
+        agent_msg = {
+            'id': f"m_{st.session_state.message_counter}",
+            'sender': 'agent',
+            'content': response_text.strip(),
+            'timestamp': time.time(),
+            'response_time': response_time,
+            'tone': response_data.get('tone', 'neutral'),
+            'retrieved_docs': len(retrieved_docs),
+            'retrieval_context': [
+                {
+                    'title': d.get('title',''),
+                    'score': round(float(d.get('score', 0.0)), 4) if isinstance(d.get('score', 0.0), (int, float)) else 0.0,
+                    'category': d.get('category','general')
+                } for d in retrieved_docs
+            ],
+            'rated': False
+        }
+        
+        append_message(agent_msg)
+        
+        # Evaluate response quality off the UI path; the result lands on agent_msg when done
+        submit_in_context(evaluate_in_background, components, agent_msg, message, retrieved_docs,
+                          executor=_background)
+        
+        rerun_chat()
         
     except Exception as e:
         st.error(f"Error processing message: {str(e)}")
@@ -1,3 +1,4 @@
+import functools
 import os, sys
 try:
 	from dotenv import load_dotenv  # type: ignore
@@ -5,6 +6,7 @@ try:
 except Exception:
 	pass
 
+@functools.lru_cache(maxsize=None)  # each setting is resolved once per process
 def _secret(name: str, default: str | None = None):
 	# 1. Env var
 	if name in os.environ:
@@ -27,23 +29,74 @@ PINECONE_API_KEY = _secret("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = _secret("PINECONE_ENVIRONMENT", "us-east-1")
 PINECONE_INDEX_NAME = _secret("PINECONE_INDEX_NAME", "customer-support-rag")
 
+# Retrieval backend: "pinecone" (remote) or "faiss" (in-process, needs faiss-cpu)
+RETRIEVAL_BACKEND = _secret("RETRIEVAL_BACKEND", "pinecone").lower()
+FAISS_INDEX_PATH = _secret("FAISS_INDEX_PATH", "data/faiss_index")
+FAISS_INDEX_FACTORY = _secret("FAISS_INDEX_FACTORY", "OPQ64,IVF4096,PQ64x8")  # 64 B/vector; "HNSW32,Flat" for higher recall
+FAISS_HNSW_EF_SEARCH = int(_secret("FAISS_HNSW_EF_SEARCH", "64"))
+FAISS_NPROBE = int(_secret("FAISS_NPROBE", "16"))  # IVF lists scanned per query: higher = better recall, slower
+FAISS_TRAIN_SAMPLE = int(_secret("FAISS_TRAIN_SAMPLE", "100000"))
+FAISS_RERANK_K = int(_secret("FAISS_RERANK_K", "100"))  # candidates re-scored with exact cosine
+
 # Model Configuration
 EMBEDDING_MODEL = _secret("EMBEDDING_MODEL", "text-embedding-3-small")
 CHAT_MODEL = _secret("CHAT_MODEL", "gpt-4o")  # newest model as of May 13 2024
+EVAL_MODEL = _secret("EVAL_MODEL", "gpt-4o-mini")  # response scoring is a simple rating task
 EMBEDDING_DIMENSION = 1536
+# Per-request timeout (seconds) and retries; the OpenAI client retries 429/5xx/timeouts with exponential backoff
+OPENAI_TIMEOUT = float(_secret("OPENAI_TIMEOUT", "30"))
+OPENAI_MAX_RETRIES = int(_secret("OPENAI_MAX_RETRIES", "5"))
 
 # Sentiment Thresholds
 ESCALATION_THRESHOLD = float(_secret("ESCALATION_THRESHOLD", "0.3"))
 HIGH_PRIORITY_THRESHOLD = float(_secret("HIGH_PRIORITY_THRESHOLD", "0.2"))
+# Rule-based escalation risks inside this band are re-scored by the model; outside it the rules decide
+ESCALATION_LLM_BAND = tuple(float(x) for x in _secret("ESCALATION_LLM_BAND", "0.15,0.85").split(","))
 
 # Response Configuration
-MAX_CONTEXT_LENGTH = int(_secret("MAX_CONTEXT_LENGTH", "4000"))
+MAX_CONTEXT_LENGTH = int(_secret("MAX_CONTEXT_LENGTH", "4000"))  # prompt input budget in tokens
 MAX_RESPONSE_LENGTH = int(_secret("MAX_RESPONSE_LENGTH", "500"))
 TEMPERATURE = float(_secret("TEMPERATURE", "0.7"))
 
+# Evaluation log: every evaluation is appended here as JSON lines ("" disables); memory keeps the latest EVAL_HISTORY_LIMIT
+EVAL_LOG_PATH = _secret("EVAL_LOG_PATH", "data/evaluations.jsonl")
+EVAL_HISTORY_LIMIT = int(_secret("EVAL_HISTORY_LIMIT", "200"))
+
+# Semantic cache for sentiment model calls; the evaluator and escalation predictor reuse exact prompts only (0 disables)
+SEMANTIC_CACHE_SIZE = int(_secret("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD = float(_secret("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # cosine similarity for a near-duplicate hit
+RESPONSE_CACHE_SIZE = int(_secret("RESPONSE_CACHE_SIZE", "256"))  # exact-prompt reply cache; 0 disables
+# Also keep sentiment-cache entries in a Pinecone namespace, shared across workers and restarts
+SHARED_SEMANTIC_CACHE = _secret("SHARED_SEMANTIC_CACHE", "0") in {"1", "true", "True"}
+
+# Embedding memo: LRU entries in memory, persisted to an SQLite file ("" keeps it in memory only)
+EMBEDDING_CACHE_SIZE = int(_secret("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_PATH = _secret("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite")
+# Knowledge-base loads of at least this many documents may be embedded via the Batch API (load_knowledge_base(use_batch_api=True))
+EMBEDDING_BATCH_THRESHOLD = int(_secret("EMBEDDING_BATCH_THRESHOLD", "1000"))
+
 # Startup tuning: skip heavy index init until first query if FAST_INIT set
 FAST_INIT = _secret("FAST_INIT", "0") in {"1", "true", "True"}
 
+__all__ = [
+	"OPENAI_API_KEY", "PINECONE_API_KEY", "PINECONE_ENVIRONMENT", "PINECONE_INDEX_NAME",
+	"RETRIEVAL_BACKEND", "FAISS_INDEX_PATH", "FAISS_INDEX_FACTORY", "FAISS_HNSW_EF_SEARCH",
+	"FAISS_NPROBE", "FAISS_TRAIN_SAMPLE", "FAISS_RERANK_K",
+	"EMBEDDING_MODEL", "CHAT_MODEL", "EVAL_MODEL", "EMBEDDING_DIMENSION", "OPENAI_TIMEOUT", "OPENAI_MAX_RETRIES",
+	"ESCALATION_THRESHOLD", "HIGH_PRIORITY_THRESHOLD", "ESCALATION_LLM_BAND",
+	"MAX_CONTEXT_LENGTH", "MAX_RESPONSE_LENGTH", "TEMPERATURE",
+	"EVAL_LOG_PATH", "EVAL_HISTORY_LIMIT", "SEMANTIC_CACHE_SIZE", "SEMANTIC_CACHE_THRESHOLD", "RESPONSE_CACHE_SIZE",
+	"SHARED_SEMANTIC_CACHE",
+	"EMBEDDING_CACHE_SIZE", "EMBEDDING_CACHE_PATH", "EMBEDDING_BATCH_THRESHOLD", "FAST_INIT",
+	"get", "warn_if_missing",
+]
+
+def get(name: str, default=None):
+	"""Resolved setting by name; falls back to env/secrets for names not defined here"""
+	if name in __all__ and name.isupper():  # settings only, not the helpers exported alongside them
+		return globals()[name]
+	return _secret(name, default)
+
 def warn_if_missing():  # pragma: no cover
 	missing = []
 	if not OPENAI_API_KEY:
@@ -4,18 +4,23 @@ Example usage:
   python evaluate.py --queries "Password reset not working" "I want a refund" --top-k 3
   python evaluate.py --query-file queries.txt --json
   python evaluate.py --dry-run
+  python evaluate.py --concurrency 8
+  python evaluate.py --batch              # queue scoring as an OpenAI Batch job
+  python evaluate.py --poll-batch BATCH_ID
 
 If real API keys are absent or --dry-run is provided, the script produces structural output without calling external services.
 """
 from __future__ import annotations
-import argparse, json, time
+import argparse, time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 import config  # ensures env vars loaded
-from modules.vector_store import VectorStore
+from modules.vector_store import VectorStore, create_vector_store
 from modules.response_generator import ResponseGenerator
 from modules.sentiment_analysis import SentimentAnalyzer
 from modules.evaluation import RAGEvaluator
 from modules.knowledge_processor import KnowledgeProcessor
+from utils.helpers import to_json
 
 def have_real_keys() -> bool:
     return (
@@ -41,11 +46,23 @@ def ensure_kb(vector_store: VectorStore):
     try:
         stats = vector_store.get_index_stats()
         if not stats or stats.get('total_vectors', 0) == 0:
-            KnowledgeProcessor().load_knowledge_base()
+            KnowledgeProcessor(vector_store).load_knowledge_base()
     except Exception:
         pass
 
-def evaluate(queries: List[str], top_k: int, dry_run: bool) -> Dict[str, Any]:
+def retrieve_all(vector_store: VectorStore, queries: List[str], top_k: int, concurrency: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Embed every distinct query in one request, then fan out the index lookups."""
+    unique = list(dict.fromkeys(queries))
+    try:
+        embeddings = vector_store.get_embeddings(unique)
+    except Exception:
+        # Per-query path still has its own fallback search
+        return {q: vector_store.similarity_search(q, k=top_k) for q in unique}
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        retrieved = list(ex.map(lambda e: vector_store.query_by_vector(e, k=top_k), embeddings))
+    return dict(zip(unique, retrieved))
+
+def evaluate(queries: List[str], top_k: int, dry_run: bool, concurrency: int = 4, batch: bool = False) -> Dict[str, Any]:
     results: List[Dict[str, Any]] = []
     t_all = time.time()
     if dry_run or not have_real_keys():
@@ -56,28 +73,51 @@ def evaluate(queries: List[str], top_k: int, dry_run: bool) -> Dict[str, Any]:
                 'metrics': {k: 0.0 for k in ['context_precision','context_recall','faithfulness','answer_relevancy','retrieval_accuracy']}
             })
         return {'dry_run': True, 'results': results, 'overall_average': 0.0}
-    vector_store = VectorStore()
+    concurrency = max(1, concurrency)
+    vector_store = create_vector_store()
     ensure_kb(vector_store)
     responder = ResponseGenerator()
     sentiment = SentimentAnalyzer()
     evaluator = RAGEvaluator()
-    history: List[Dict[str, Any]] = []
-    for q in queries:
+    retrieved_by_query = retrieve_all(vector_store, queries, top_k, concurrency)
+    # Several queries share each sentiment request
+    sentiment_by_query = dict(zip(queries, sentiment.analyze_sentiment_batch(queries)))
+
+    def run_one(q: str) -> Dict[str, Any]:
+        # Queries run concurrently, so each one is scored as a fresh conversation
         t0 = time.time()
-        retrieved = vector_store.similarity_search(q, k=top_k)
-        sent = sentiment.analyze_sentiment(q)
-        resp = responder.generate_response(q, retrieved, history, sent)
+        retrieved = retrieved_by_query[q]
+        sent = sentiment_by_query[q]
+        resp = responder.generate_response(q, retrieved, [], sent)
+        if batch:
+            # Scored later by the Batch API; keep what the evaluator needs
+            return {
+                'query': q,
+                'response': resp['response'],
+                'retrieved_docs': retrieved,
+                'latency_s': round(time.time() - t0, 2)
+            }
         eval_res = evaluator.evaluate_response(q, resp['response'], retrieved)
-        history.append({'sender': 'customer', 'content': q, **sent})
-        history.append({'sender': 'agent', 'content': resp['response']})
-        results.append({
+        return {
             'query': q,
             'response': resp['response'],
             'retrieved_docs': [d.get('title','') for d in retrieved],
             'overall_score': eval_res['overall_score'],
             'metrics': eval_res['metrics'],
             'latency_s': round(time.time() - t0, 2)
-        })
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(run_one, queries))
+    if batch:
+        batch_id = evaluator.submit_batch(results)
+        return {
+            'dry_run': False,
+            'batch_id': batch_id,
+            'query_count': len(results),
+            'results': [{**r, 'retrieved_docs': [d.get('title','') for d in r['retrieved_docs']]} for r in results],
+            'total_time_s': round(time.time() - t_all, 2)
+        }
     overall_avg = sum(r['overall_score'] for r in results) / len(results)
     return {
         'dry_run': False,
@@ -94,19 +134,38 @@ def main():
     parser.add_argument('--top-k', type=int, default=3, help='Top K documents to retrieve')
     parser.add_argument('--json', action='store_true', help='Output raw JSON only')
     parser.add_argument('--dry-run', action='store_true', help='Skip external API calls')
+    parser.add_argument('--concurrency', type=int, default=4, help='Queries processed in parallel')
+    parser.add_argument('--batch', action='store_true', help='Submit scoring as an OpenAI Batch job (50%% cheaper, async)')
+    parser.add_argument('--poll-batch', metavar='BATCH_ID', help='Collect results of a submitted evaluation batch')
     args = parser.parse_args()
+    if args.poll_batch:
+        results = RAGEvaluator().poll_batch(args.poll_batch)
+        if results is None:
+            print(f'Batch {args.poll_batch} is still running.')
+            return
+        scores = [r['overall_score'] for r in results]
+        print(to_json({
+            'batch_id': args.poll_batch,
+            'overall_average': sum(scores) / len(scores) if scores else 0.0,
+            'results': results
+        }, indent=True))
+        return
     dry_run = args.dry_run
     if not dry_run and not have_real_keys():
         print('⚠️  Real API keys not found; running in dry-run mode.')
         dry_run = True
     queries = load_queries(args)
-    report = evaluate(queries, args.top_k, dry_run)
+    report = evaluate(queries, args.top_k, dry_run, args.concurrency, args.batch and not dry_run)
     if args.json:
-        print(json.dumps(report, indent=2))
+        print(to_json(report, indent=True))
         return
     print('\n=== Evaluation Report ===')
     print(f"Mode: {'DRY-RUN' if report.get('dry_run') else 'LIVE'}")
     print(f"Queries: {len(report.get('results', []))}")
+    if report.get('batch_id'):
+        print(f"Submitted evaluation batch {report['batch_id']}; collect with --poll-batch {report['batch_id']}")
+        print('\nDone.')
+        return
     if not report.get('dry_run'):
         print(f"Overall Average Score: {report.get('overall_average', 0):.3f}")
     for r in report['results']:
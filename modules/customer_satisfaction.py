@@ -1,36 +1,86 @@
 import time
 from typing import List, Dict, Any
+import numpy as np
 
 
 class CustomerSatisfactionTracker:
-    """Track and analyze customer satisfaction feedback for optimization."""
+    """Track and analyze customer satisfaction feedback for optimization.
 
-    def __init__(self):
-        self.history: List[Dict[str, Any]] = []
+    Feedback is kept column-wise in NumPy ring buffers (ratings, timestamps)
+    holding the most recent ``capacity`` entries; buffers grow geometrically
+    so short sessions stay small. A parallel buffer of running rating sums
+    makes window averages O(1).
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        size = min(capacity, 64)
+        self._ratings = np.empty(size, dtype=np.int8)
+        self._timestamps = np.empty(size, dtype=np.float64)
+        self._sums_before = np.empty(size, dtype=np.int64)  # running total preceding each entry
+        self._total = 0
+        self._message_ids: List[str] = []
+        self._comments: List[str] = []
+        self._n = 0  # total feedback ever added
+
+    def __len__(self) -> int:
+        return min(self._n, self.capacity)
+
+    def _grow(self):
+        size = min(self.capacity, len(self._ratings) * 2)
+        self._ratings = np.resize(self._ratings, size)
+        self._timestamps = np.resize(self._timestamps, size)
+        self._sums_before = np.resize(self._sums_before, size)
+
+    def _slot(self, i: int) -> int:
+        """Buffer slot of the i-th retained entry (0 = oldest)"""
+        return (self._n - len(self) + i) % self.capacity
+
+    def _sum_before(self, i: int) -> int:
+        """Running rating total preceding the i-th retained entry (i == len -> grand total)"""
+        if i == len(self):
+            return self._total
+        return int(self._sums_before[self._slot(i)])
+
+    def _window_mean(self, start: int, stop: int) -> float:
+        return (self._sum_before(stop) - self._sum_before(start)) / (stop - start)
 
     def add_feedback(self, message_id: str, rating: int, comment: str | None = None):
+        slot = self._n % self.capacity
+        if slot >= len(self._ratings):
+            self._grow()
         feedback = {
             "timestamp": time.time(),
             "message_id": message_id,
             "rating": int(rating),
             "comment": comment or ""
         }
-        self.history.append(feedback)
+        self._ratings[slot] = feedback["rating"]
+        self._timestamps[slot] = feedback["timestamp"]
+        self._sums_before[slot] = self._total
+        self._total += feedback["rating"]
+        if slot < len(self._message_ids):
+            self._message_ids[slot] = message_id
+            self._comments[slot] = feedback["comment"]
+        else:
+            self._message_ids.append(message_id)
+            self._comments.append(feedback["comment"])
+        self._n += 1
         return feedback
 
     def average_rating(self, last_n: int | None = None) -> float | None:
-        data = self.history[-last_n:] if last_n else self.history
-        if not data:
+        size = len(self)
+        if not size:
             return None
-        return sum(f["rating"] for f in data) / len(data)
+        count = min(last_n, size) if last_n else size
+        return self._window_mean(size - count, size)
 
     def rating_trend(self, window: int = 5) -> str:
-        if len(self.history) < window * 2:
+        size = len(self)
+        if size < window * 2:
             return "insufficient_data"
-        first = self.history[:window]
-        last = self.history[-window:]
-        first_avg = sum(f["rating"] for f in first) / window
-        last_avg = sum(f["rating"] for f in last) / window
+        first_avg = self._window_mean(0, window)
+        last_avg = self._window_mean(size - window, size)
         if last_avg > first_avg + 0.4:
             return "improving"
         if last_avg < first_avg - 0.4:
@@ -38,4 +88,13 @@ class CustomerSatisfactionTracker:
         return "stable"
 
     def export(self) -> List[Dict[str, Any]]:
-        return self.history
+        feedback = []
+        for i in range(len(self)):
+            slot = self._slot(i)
+            feedback.append({
+                "timestamp": float(self._timestamps[slot]),
+                "message_id": self._message_ids[slot],
+                "rating": int(self._ratings[slot]),
+                "comment": self._comments[slot]
+            })
+        return feedback
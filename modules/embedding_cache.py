@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+import numpy as np
+import config
+
+
+class EmbeddingCache:
+    """Text -> embedding memo: an in-memory LRU in front of an optional SQLite file.
+
+    Keys hash the embedding model together with the text, so changing
+    EMBEDDING_MODEL never serves vectors from another model. Vectors are
+    kept as float32 arrays in memory (about 6 KB per 1536-d vector, versus
+    roughly 50 KB as a list of Python floats) and as float32 blobs on disk;
+    delete the file to reset the cache.
+    """
+
+    def __init__(self, path: str = "", max_entries: int = 4096):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.sha256(f"{config.EMBEDDING_MODEL}\0{text}".encode("utf-8")).digest()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(self.path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB)")
+            except sqlite3.Error:
+                self.path = ""  # unusable location; keep the in-memory cache only
+                self._db = None
+        return self._db
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached embedding for each text, or None where it has not been embedded yet"""
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            found = {key: self._memory[key] for key in keys if key in self._memory}
+            for key in found:
+                self._memory.move_to_end(key)
+            missing = list({key for key in keys if key not in found})
+            db = self._connection() if missing else None
+            if db is not None:
+                try:
+                    rows = db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(missing))})", missing
+                    ).fetchall()
+                except sqlite3.Error:
+                    rows = []
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+        return [found[key].tolist() if key in found else None for key in keys]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[List[float]]):
+        """Store freshly computed embeddings in memory and on disk"""
+        keys = [self._key(text) for text in texts]
+        arrays = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+        with self._lock:
+            for key, vector in zip(keys, arrays):
+                self._remember(key, vector)
+            db = self._connection()
+            if db is not None:
+                try:
+                    with db:
+                        db.executemany(
+                            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                            [(key, vector.tobytes()) for key, vector in zip(keys, arrays)]
+                        )
+                except sqlite3.Error:
+                    pass  # the disk layer is best-effort
@@ -1,14 +1,60 @@
-import json
+import re
+from bisect import bisect_right
 import time
-from typing import List, Dict, Any
-from openai import OpenAI
+from collections import Counter, deque
+from typing import List, Dict, Any, Optional
+import numpy as np
 import streamlit as st
 import config
+from modules.semantic_cache import SemanticCache
+from utils.helpers import from_json, get_openai_client
+
+# Latest messages shown to the model as conversation context
+CONTEXT_MESSAGES = 5
+
+ESCALATION_KEYWORDS = [
+    "manager", "supervisor", "complaint", "unacceptable",
+    "cancel", "refund", "lawsuit", "terrible", "awful",
+    "frustrated", "angry", "disappointed", "urgent"
+]
+URGENCY_WORDS = ["urgent", "asap", "immediately", "now", "today", "emergency"]
+
+# Substring matches (e.g. "refunded" counts as "refund"), compiled once
+ESCALATION_KEYWORDS_RE = re.compile("|".join(map(re.escape, ESCALATION_KEYWORDS)))
+URGENCY_WORDS_RE = re.compile("|".join(map(re.escape, URGENCY_WORDS)))
+
+# Static instructions go first (system message) so every request shares an
+# identical prompt prefix; the conversation-specific details follow.
+ESCALATION_INSTRUCTIONS = """You are an expert in customer service escalation prediction. Analyze conversations to predict when customers might escalate issues.
+
+Analyze the escalation risk for the customer support conversation that follows.
+
+Consider these factors:
+1. Sentiment deterioration over time
+2. Use of escalation keywords
+3. Urgency and frustration indicators
+4. Length and complexity of the issue
+5. Customer communication patterns
+
+Provide an escalation risk score from 0.0 (no risk) to 1.0 (immediate escalation likely).
+
+Respond with JSON:
+{
+    "escalation_risk": number,
+    "confidence": number,
+    "primary_factors": ["factor1", "factor2", "factor3"],
+    "recommendation": "action_recommendation"
+}"""
 
 class EscalationPredictor:
     def __init__(self):
         """Initialize escalation predictor"""
-        self.openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
+        # Exact repeats only: the prompt's numeric features barely move its embedding,
+        # so a near-duplicate match could return a stale risk score
+        self.semantic_cache = (
+            SemanticCache(None, max_entries=config.SEMANTIC_CACHE_SIZE) if config.SEMANTIC_CACHE_SIZE > 0 else None
+        )
         
         # Escalation risk thresholds
         self.risk_levels = {
@@ -17,6 +63,13 @@ class EscalationPredictor:
             (0.6, 0.8): "high",
             (0.8, 1.0): "critical"
         }
+        # Lower bounds of every band after the first, for bisect lookups
+        bands = sorted(self.risk_levels.items())
+        self._risk_thresholds = [min_val for (min_val, _), _ in bands[1:]]
+        self._risk_labels = [level for _, level in bands]
+        
+        # (rule-based, model) risk pairs for calls that reached the model, used to tune ESCALATION_LLM_BAND
+        self.score_pairs = deque(maxlen=500)
         
         # Pattern indicators
         self.escalation_patterns = {
@@ -28,11 +81,19 @@ class EscalationPredictor:
             "unresolved_complaints": 0.7
         }
     
-    def predict_escalation(self, current_message: str, conversation_history: List[Dict]) -> float:
-        """Predict escalation risk based on current message and conversation history"""
+    def predict_escalation(self, current_message: str, conversation_history: List[Dict],
+                           conversation_features: Optional[Dict[str, Any]] = None) -> float:
+        """Predict escalation risk based on current message and conversation history.
+
+        Pass ``conversation_features`` (e.g. from ConversationFeatureTracker) to skip
+        re-extracting them from the full history.
+        """
         try:
             # Extract features from conversation
-            features = self._extract_conversation_features(conversation_history)
+            if conversation_features is None:
+                features = self._extract_conversation_features(conversation_history)
+            else:
+                features = conversation_features
             
             # Analyze current message
             message_features = self._analyze_current_message(current_message)
@@ -40,8 +101,15 @@ class EscalationPredictor:
             # Combine features
             all_features = {**features, **message_features}
             
+            # Clear-cut cases are settled by the rules; the model only sees the ambiguous band
+            rule_risk = self._rule_based_prediction(all_features)
+            low, high = config.ESCALATION_LLM_BAND
+            if rule_risk < low or rule_risk > high:
+                return rule_risk
+            
             # Use AI to predict escalation risk
             escalation_risk = self._ai_predict_escalation(current_message, all_features, conversation_history)
+            self.score_pairs.append((rule_risk, escalation_risk))
             
             return max(0.0, min(1.0, escalation_risk))
             
@@ -54,140 +122,109 @@ class EscalationPredictor:
         if not conversation_history:
             return {}
         
-        customer_messages = [msg for msg in conversation_history if msg['sender'] == 'customer']
-        agent_messages = [msg for msg in conversation_history if msg['sender'] == 'agent']
+        # Single traversal; derived features are computed from the locals afterwards
+        n_cust = n_agent = 0
+        sent_scores = []
+        word_counter = Counter()
+        for msg in conversation_history:
+            sender = msg['sender']
+            if sender == 'agent':
+                n_agent += 1
+            elif sender == 'customer':
+                n_cust += 1
+                if 'sentiment_score' in msg:
+                    sent_scores.append(msg['sentiment_score'])
+                word_counter.update(word for word in msg['content'].lower().split() if len(word) > 4)
+        
+        first_ts = conversation_history[0].get('timestamp', time.time())
+        last_ts = conversation_history[-1].get('timestamp', time.time())
         
         features = {
-            "message_count": len(customer_messages),
+            "message_count": n_cust,
             "conversation_length": len(conversation_history),
-            "response_ratio": len(agent_messages) / max(len(customer_messages), 1),
-            "conversation_duration": 0,
+            "response_ratio": n_agent / max(n_cust, 1),
+            "conversation_duration": last_ts - first_ts,
             "sentiment_trend": 0.5,
-            "repeated_issues": False,
+            # Any longer word appearing more than twice across 3+ customer messages
+            "repeated_issues": n_cust > 2 and any(count > 2 for count in word_counter.values()),
             "unresolved_count": 0
         }
         
-        # Calculate conversation duration
-        if conversation_history:
-            start_time = conversation_history[0].get('timestamp', time.time())
-            end_time = conversation_history[-1].get('timestamp', time.time())
-            features["conversation_duration"] = end_time - start_time
-        
-        # Analyze sentiment trend
-        sentiment_scores = [
-            msg.get('sentiment_score', 0.5) 
-            for msg in customer_messages 
-            if 'sentiment_score' in msg
-        ]
-        
-        if len(sentiment_scores) >= 2:
+        scores = np.asarray(sent_scores, dtype=np.float64)
+        if scores.size >= 2:
             # Calculate sentiment trend (negative = deteriorating)
-            recent_sentiment = sum(sentiment_scores[-3:]) / min(3, len(sentiment_scores))
-            earlier_sentiment = sum(sentiment_scores[:3]) / min(3, len(sentiment_scores))
-            features["sentiment_trend"] = recent_sentiment - earlier_sentiment
-            features["current_sentiment"] = sentiment_scores[-1]
-            features["min_sentiment"] = min(sentiment_scores)
-        
-        # Check for repeated issues (simplified)
-        customer_content = [msg['content'].lower() for msg in customer_messages]
-        if len(customer_content) > 2:
-            # Look for repeated keywords
-            all_words = ' '.join(customer_content).split()
-            word_freq = {}
-            for word in all_words:
-                if len(word) > 4:  # Only consider longer words
-                    word_freq[word] = word_freq.get(word, 0) + 1
-            
-            # If any word appears more than twice, consider it repeated
-            features["repeated_issues"] = any(count > 2 for count in word_freq.values())
+            features["sentiment_trend"] = float(scores[-3:].mean() - scores[:3].mean())
+            features["current_sentiment"] = float(scores[-1])
+            features["min_sentiment"] = float(scores.min())
         
         return features
     
     def _analyze_current_message(self, message: str) -> Dict[str, Any]:
         """Analyze current message for escalation indicators"""
-        escalation_keywords = [
-            "manager", "supervisor", "complaint", "unacceptable",
-            "cancel", "refund", "lawsuit", "terrible", "awful",
-            "frustrated", "angry", "disappointed", "urgent"
-        ]
-        
         message_lower = message.lower()
         
+        # Number of distinct keywords present anywhere in the message, in one regex pass each
         features = {
             "message_length": len(message),
-            "escalation_keywords": sum(1 for keyword in escalation_keywords if keyword in message_lower),
-            "caps_ratio": sum(1 for c in message if c.isupper()) / max(len(message), 1),
+            "escalation_keywords": len(set(ESCALATION_KEYWORDS_RE.findall(message_lower))),
+            "caps_ratio": sum(map(str.isupper, message)) / max(len(message), 1),
             "question_marks": message.count('?'),
             "exclamation_marks": message.count('!'),
-            "urgency_indicators": 0
+            "urgency_indicators": len(set(URGENCY_WORDS_RE.findall(message_lower)))
         }
         
-        # Check for urgency indicators
-        urgency_words = ["urgent", "asap", "immediately", "now", "today", "emergency"]
-        features["urgency_indicators"] = sum(1 for word in urgency_words if word in message_lower)
-        
         return features
     
     def _ai_predict_escalation(self, message: str, features: Dict, conversation_history: List[Dict]) -> float:
         """Use AI to predict escalation risk based on features and context"""
         try:
             # Prepare conversation context
-            recent_messages = conversation_history[-5:] if conversation_history else []
+            recent_messages = conversation_history[-CONTEXT_MESSAGES:] if conversation_history else []
             context = "\n".join([
                 f"{msg['sender']}: {msg['content']}" 
                 for msg in recent_messages
             ])
             
-            prompt = f"""
-            Analyze the escalation risk for this customer support conversation.
-            
-            Current customer message: "{message}"
-            
-            Recent conversation context:
-            {context}
-            
-            Conversation features:
-            - Message count: {features.get('message_count', 0)}
-            - Conversation duration: {features.get('conversation_duration', 0):.0f} seconds
-            - Sentiment trend: {features.get('sentiment_trend', 0):.2f} (negative = deteriorating)
-            - Current sentiment: {features.get('current_sentiment', 0.5):.2f}
-            - Escalation keywords found: {features.get('escalation_keywords', 0)}
-            - Urgency indicators: {features.get('urgency_indicators', 0)}
-            - Caps usage ratio: {features.get('caps_ratio', 0):.2f}
-            
-            Consider these factors:
-            1. Sentiment deterioration over time
-            2. Use of escalation keywords
-            3. Urgency and frustration indicators
-            4. Length and complexity of the issue
-            5. Customer communication patterns
-            
-            Provide an escalation risk score from 0.0 (no risk) to 1.0 (immediate escalation likely).
-            
-            Respond with JSON:
-            {{
-                "escalation_risk": number,
-                "confidence": number,
-                "primary_factors": ["factor1", "factor2", "factor3"],
-                "recommendation": "action_recommendation"
-            }}
-            """
+            content = f"""Recent conversation context:
+{context}
+
+Conversation features:
+- Message count: {features.get('message_count', 0)}
+- Conversation duration: {features.get('conversation_duration', 0):.0f} seconds
+- Sentiment trend: {features.get('sentiment_trend', 0):.2f} (negative = deteriorating)
+- Current sentiment: {features.get('current_sentiment', 0.5):.2f}
+- Escalation keywords found: {features.get('escalation_keywords', 0)}
+- Urgency indicators: {features.get('urgency_indicators', 0)}
+- Caps usage ratio: {features.get('caps_ratio', 0):.2f}
+
+Current customer message: "{message}"
+"""
             
-            response = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert in customer service escalation prediction. "
-                        "Analyze conversations to predict when customers might escalate issues."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
+            def request() -> Dict[str, Any]:
+                response = self.openai_client.chat.completions.create(
+                    model=config.CHAT_MODEL,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
+                    messages=[
+                        {"role": "system", "content": ESCALATION_INSTRUCTIONS},
+                        {"role": "user", "content": content}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                )
+                return from_json(response.choices[0].message.content)
             
-            result = json.loads(response.choices[0].message.content)
+            # Identical conversations with the same (rounded) features reuse an earlier prediction;
+            # the duration is bucketed to minutes since it changes on every call
+            if self.semantic_cache is None:
+                result = request()
+            else:
+                cache_key = "\n".join([
+                    context, message,
+                    f"{features.get('message_count', 0)}|{features.get('conversation_duration', 0) // 60:.0f}"
+                    f"|{features.get('sentiment_trend', 0):.2f}|{features.get('current_sentiment', 0.5):.2f}"
+                    f"|{features.get('escalation_keywords', 0)}|{features.get('urgency_indicators', 0)}"
+                    f"|{features.get('caps_ratio', 0):.2f}",
+                ])
+                result = self.semantic_cache.get_or_compute("escalation", cache_key, request)
             return result.get("escalation_risk", 0.5)
             
         except Exception as e:
@@ -264,7 +301,66 @@ class EscalationPredictor:
     
     def _get_risk_level(self, score: float) -> str:
         """Get risk level based on score"""
-        for (min_val, max_val), level in self.risk_levels.items():
-            if min_val <= score < max_val:
-                return level
-        return "critical" if score >= 0.8 else "low"
+        return self._risk_labels[bisect_right(self._risk_thresholds, score)]
+
+
+class ConversationFeatureTracker:
+    """Incrementally maintained equivalent of EscalationPredictor._extract_conversation_features"""
+
+    def __init__(self):
+        self.customer_count = 0
+        self.agent_count = 0
+        self.message_count = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.first_sentiments: List[float] = []
+        self.recent_sentiments = deque(maxlen=3)
+        self.sentiment_count = 0
+        self.min_sentiment = None
+        self.word_freq: Counter = Counter()
+        self.max_word_count = 0
+
+    def update(self, msg: Dict):
+        """Fold one appended message into the running features"""
+        self.message_count += 1
+        timestamp = msg.get('timestamp', time.time())
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+        if msg['sender'] == 'agent':
+            self.agent_count += 1
+        elif msg['sender'] == 'customer':
+            self.customer_count += 1
+            if 'sentiment_score' in msg:
+                score = msg.get('sentiment_score', 0.5)
+                self.sentiment_count += 1
+                if len(self.first_sentiments) < 3:
+                    self.first_sentiments.append(score)
+                self.recent_sentiments.append(score)
+                self.min_sentiment = score if self.min_sentiment is None else min(self.min_sentiment, score)
+            for word in msg['content'].lower().split():
+                if len(word) > 4:  # Only consider longer words
+                    self.word_freq[word] += 1
+                    self.max_word_count = max(self.max_word_count, self.word_freq[word])
+
+    def features(self) -> Dict[str, Any]:
+        """Current feature dict, same keys and values as a full history scan"""
+        if not self.message_count:
+            return {}
+        features = {
+            "message_count": self.customer_count,
+            "conversation_length": self.message_count,
+            "response_ratio": self.agent_count / max(self.customer_count, 1),
+            "conversation_duration": self.last_timestamp - self.first_timestamp,
+            "sentiment_trend": 0.5,
+            "repeated_issues": self.customer_count > 2 and self.max_word_count > 2,
+            "unresolved_count": 0
+        }
+        if self.sentiment_count >= 2:
+            recent_sentiment = sum(self.recent_sentiments) / len(self.recent_sentiments)
+            earlier_sentiment = sum(self.first_sentiments) / len(self.first_sentiments)
+            features["sentiment_trend"] = recent_sentiment - earlier_sentiment
+            features["current_sentiment"] = self.recent_sentiments[-1]
+            features["min_sentiment"] = self.min_sentiment
+        return features
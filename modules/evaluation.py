@@ -1,15 +1,54 @@
-import json
+import os
+import threading
 import time
+from collections import deque
 import numpy as np
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
 import streamlit as st
 import config
+from modules.semantic_cache import SemanticCache
+from utils.helpers import from_json, get_openai_client, to_json, truncate_to_tokens, unit_score
+
+# The scoring rubric is sent verbatim as the system message so every request
+# starts with an identical prefix (eligible for provider-side prompt caching);
+# the per-call query, context and response follow in the user message.
+EVALUATE_ALL_INSTRUCTIONS = """You evaluate retrieval-augmented customer support answers.
+
+Rate each of the following from 0.0 to 1.0:
+- context_precision: how relevant the retrieved context is to the query and how little irrelevant information it includes
+- context_recall: how much of the information needed to answer (and the key facts of the ground truth, if given) the context covers
+- faithfulness: whether the response sticks to the context without hallucinated or misrepresented facts
+- answer_relevancy: how directly and usefully the response addresses the query
+- document_relevance: one score per retrieved document, in order, for how relevant it is to the query
+
+Respond with JSON:
+{
+    "context_precision": number,
+    "context_recall": number,
+    "faithfulness": number,
+    "answer_relevancy": number,
+    "document_relevance": [number, ...],
+    "reasoning": "explanation"
+}"""
+
+# Token budgets for the context shown to the evaluator (about 2000 / 500 characters)
+CONTEXT_TOKENS = 500
+DOCUMENT_EXCERPT_TOKENS = 125
+
+# Metrics averaged by get_evaluation_summary
+SUMMARY_METRICS = ("context_precision", "faithfulness", "answer_relevancy", "retrieval_accuracy")
+# Overall-score weight of each summary metric, in SUMMARY_METRICS order
+OVERALL_WEIGHTS = np.array([0.2, 0.3, 0.3, 0.2])
 
 class RAGEvaluator:
     def __init__(self):
         """Initialize RAGAS evaluator"""
-        self.openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
+        # Exact prompts only: evaluation prompts are mostly retrieved context, so a near-duplicate
+        # prompt can carry a different response and must not reuse its scores
+        self.semantic_cache = (
+            SemanticCache(None, max_entries=config.SEMANTIC_CACHE_SIZE) if config.SEMANTIC_CACHE_SIZE > 0 else None
+        )
         
         # Evaluation metrics
         self.metrics = {
@@ -21,48 +60,43 @@ class RAGEvaluator:
             "response_latency": 0.0
         }
         
-        # Evaluation history
-        self.evaluation_history = []
+        # Recent evaluation history (the full log is appended to EVAL_LOG_PATH),
+        # plus the summary metrics kept column-wise (one contiguous row per
+        # metric) for fast windows
+        self.evaluation_history = deque(maxlen=config.EVAL_HISTORY_LIMIT)
+        self._scores = np.empty((len(SUMMARY_METRICS) + 1, 64), dtype=np.float64)
+        self._score_count = 0
+        self.log_path = config.EVAL_LOG_PATH
+        self._log_lock = threading.Lock()
+        
+        # Pending Batch API jobs (records awaiting results, keyed by batch id)
+        self.batch_dir = "data/eval_batches"
     
     def evaluate_response(self, query: str, response: str, retrieved_docs: List[Dict], 
-                         ground_truth: Optional[str] = None) -> Dict[str, Any]:
-        """Comprehensive evaluation using RAGAS-inspired metrics"""
+                         ground_truth: Optional[str] = None, mode: str = "sync") -> Dict[str, Any]:
+        """Comprehensive evaluation using RAGAS-inspired metrics.
+
+        ``mode="batch"`` queues the evaluation as an OpenAI Batch job instead and
+        returns its batch id; results land in the history via ``poll_batch``.
+        """
+        if mode == "batch":
+            record = {"query": query, "response": response, "retrieved_docs": retrieved_docs,
+                      "ground_truth": ground_truth}
+            return {"batch_id": self.submit_batch([record]), "status": "submitted"}
+        
         try:
             start_time = time.time()
             
-            # Evaluate different aspects
-            context_precision = self._evaluate_context_precision(query, retrieved_docs)
-            context_recall = self._evaluate_context_recall(query, retrieved_docs, ground_truth)
-            faithfulness = self._evaluate_faithfulness(response, retrieved_docs)
-            answer_relevancy = self._evaluate_answer_relevancy(query, response)
-            retrieval_accuracy = self._evaluate_retrieval_accuracy(query, retrieved_docs)
+            # Evaluate all aspects with a single model call
+            scores = self._evaluate_all(query, response, retrieved_docs, ground_truth)
             
             evaluation_time = time.time() - start_time
             
             # Compile results
-            evaluation_result = {
-                "timestamp": time.time(),
-                "query": query,
-                "response": response,
-                "metrics": {
-                    "context_precision": context_precision,
-                    "context_recall": context_recall,
-                    "faithfulness": faithfulness,
-                    "answer_relevancy": answer_relevancy,
-                    "retrieval_accuracy": retrieval_accuracy,
-                    "evaluation_latency": evaluation_time
-                },
-                "retrieved_docs_count": len(retrieved_docs),
-                "overall_score": self._calculate_overall_score({
-                    "context_precision": context_precision,
-                    "faithfulness": faithfulness,
-                    "answer_relevancy": answer_relevancy,
-                    "retrieval_accuracy": retrieval_accuracy
-                })
-            }
+            evaluation_result = self._build_result(query, response, retrieved_docs, scores, evaluation_time)
             
             # Store in history
-            self.evaluation_history.append(evaluation_result)
+            self._record(evaluation_result)
             
             return evaluation_result
             
@@ -84,279 +118,277 @@ class RAGEvaluator:
                 "error": str(e)
             }
     
-    def _evaluate_context_precision(self, query: str, retrieved_docs: List[Dict]) -> float:
-        """Evaluate how precise the retrieved context is"""
-        if not retrieved_docs:
-            return 0.0
+    def _record(self, evaluation_result: Dict[str, Any]):
+        """Append an evaluation to the log, the recent history and the columnar score buffer"""
+        # One lock for all three so background evaluations land in the same order everywhere
+        with self._log_lock:
+            if self.log_path:
+                try:
+                    os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                    with open(self.log_path, 'a', encoding='utf-8') as f:
+                        f.write(to_json(evaluation_result) + "\n")
+                except OSError as e:
+                    st.warning(f"Failed to write evaluation log: {str(e)}")
+            
+            if self._score_count == self._scores.shape[1]:
+                limit = self.evaluation_history.maxlen
+                if self._score_count >= 2 * limit:
+                    # Keep the newest `limit` columns, matching the history window
+                    self._scores[:, :limit] = self._scores[:, self._score_count - limit:self._score_count]
+                    self._score_count = limit
+                else:
+                    self._scores = np.concatenate([self._scores, np.empty_like(self._scores)], axis=1)
+            metrics = evaluation_result["metrics"]
+            column = [metrics.get(metric, 0.0) for metric in SUMMARY_METRICS]
+            self._scores[:, self._score_count] = column + [evaluation_result["overall_score"]]
+            self._score_count += 1
+            self.evaluation_history.append(evaluation_result)
+    
+    def _build_result(self, query: str, response: str, retrieved_docs: List[Dict],
+                      scores: Dict[str, float], evaluation_time: float) -> Dict[str, Any]:
+        """Evaluation record as stored in the history"""
+        return {
+            "timestamp": time.time(),
+            "query": query,
+            "response": response,
+            "metrics": {
+                "context_precision": scores["context_precision"],
+                "context_recall": scores["context_recall"],
+                "faithfulness": scores["faithfulness"],
+                "answer_relevancy": scores["answer_relevancy"],
+                "retrieval_accuracy": scores["retrieval_accuracy"],
+                "evaluation_latency": evaluation_time
+            },
+            "retrieved_docs_count": len(retrieved_docs),
+            "overall_score": self._calculate_overall_score(scores)
+        }
+    
+    def submit_batch(self, records: List[Dict[str, Any]]) -> str:
+        """Queue fused evaluations for many records as one OpenAI Batch job (half price, completes within 24h).
+
+        Each record holds "query", "response", "retrieved_docs" and optionally
+        "ground_truth". The records are saved next to the batch id so
+        ``poll_batch`` can reconcile results from another process.
+        """
+        lines = []
+        for i, record in enumerate(records):
+            content = self._evaluate_all_content(
+                record["query"], record["response"], record.get("retrieved_docs", []), record.get("ground_truth")
+            )
+            lines.append(to_json({
+                "custom_id": f"eval-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": config.EVAL_MODEL,
+                    "messages": [
+                        {"role": "system", "content": EVALUATE_ALL_INSTRUCTIONS},
+                        {"role": "user", "content": content}
+                    ],
+                    "response_format": {"type": "json_object"},
+                    "temperature": 0.2
+                }
+            }))
         
+        batch_input = self.openai_client.files.create(
+            file=("evaluations.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.openai_client.batches.create(
+            input_file_id=batch_input.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        os.makedirs(self.batch_dir, exist_ok=True)
+        with open(os.path.join(self.batch_dir, f"{batch.id}.json"), 'w', encoding='utf-8') as f:
+            f.write(to_json({"submitted_at": time.time(), "records": records}))
+        return batch.id
+    
+    def poll_batch(self, batch_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Collect a finished evaluation batch into the history; None while it is still running.
+
+        Results are recorded once; later polls of the same batch return the stored results.
+        """
         try:
-            # Create context from retrieved documents
-            context = "\n".join([doc.get('content', '') for doc in retrieved_docs])
-            
-            prompt = f"""
-            Evaluate the precision of the retrieved context for answering the query.
-            
-            Query: "{query}"
-            
-            Retrieved Context:
-            {context[:2000]}...
-            
-            Rate the precision from 0.0 to 1.0 based on:
-            1. How relevant each piece of context is to the query
-            2. How much irrelevant information is included
-            3. Whether the context directly addresses the query
-            
-            Respond with JSON:
-            {{
-                "precision_score": number,
-                "reasoning": "explanation"
-            }}
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.2
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return max(0.0, min(1.0, result.get("precision_score", 0.5)))
+            pending_path = os.path.join(self.batch_dir, f"{batch_id}.json")
+            with open(pending_path, 'r', encoding='utf-8') as f:
+                pending = from_json(f.read())
+            if "results" in pending:
+                return pending["results"]  # already reconciled
+            
+            batch = self.openai_client.batches.retrieve(batch_id)
+            if batch.status in ("failed", "expired", "cancelled"):
+                st.error(f"Evaluation batch {batch_id} {batch.status}")
+                return []
+            if batch.status != "completed":
+                return None
+            
+            records = pending["records"]
+            turnaround = time.time() - pending["submitted_at"]
+            
+            outputs = {}
+            if batch.output_file_id:
+                for line in self.openai_client.files.content(batch.output_file_id).text.splitlines():
+                    if line.strip():
+                        item = from_json(line)
+                        outputs[item["custom_id"]] = item
+            
+            results = []
+            for i, record in enumerate(records):
+                try:
+                    body = outputs[f"eval-{i}"]["response"]["body"]
+                    result = from_json(body["choices"][0]["message"]["content"])
+                except Exception:
+                    result = {}  # failed request: same defaults as a failed sync call
+                retrieved_docs = record.get("retrieved_docs", [])
+                scores = self._scores_from_result(result, retrieved_docs, record.get("ground_truth"))
+                # No request latency to report for a batch; the submit-to-collect time is kept separately
+                evaluation = self._build_result(record["query"], record["response"], retrieved_docs, scores, 0.0)
+                evaluation["batch_turnaround"] = turnaround
+                results.append(evaluation)
+            
+            for result in results:
+                self._record(result)
+            
+            # Mark the batch reconciled so a repeated poll doesn't record it twice
+            pending["results"] = results
+            with open(pending_path, 'w', encoding='utf-8') as f:
+                f.write(to_json(pending))
+            return results
             
         except Exception as e:
-            st.warning(f"Context precision evaluation failed: {str(e)}")
-            return 0.5
+            st.error(f"Failed to collect evaluation batch: {str(e)}")
+            return []
     
-    def _evaluate_context_recall(self, query: str, retrieved_docs: List[Dict], 
-                                ground_truth: Optional[str] = None) -> float:
-        """Evaluate how much relevant context was retrieved"""
-        if not retrieved_docs:
-            return 0.0
-        
-        try:
-            # If no ground truth, use heuristic evaluation
-            if not ground_truth:
-                # Simple heuristic: more relevant docs = better recall
-                relevance_scores = [doc.get('score', 0.5) for doc in retrieved_docs]
-                avg_relevance = sum(relevance_scores) / len(relevance_scores)
-                return min(1.0, avg_relevance * 1.2)  # Scale up slightly
-            
-            # With ground truth, compare coverage
-            context = "\n".join([doc.get('content', '') for doc in retrieved_docs])
-            
-            prompt = f"""
-            Evaluate how well the retrieved context covers the information needed to answer the query.
-            
-            Query: "{query}"
-            Ground Truth Answer: "{ground_truth}"
-            
-            Retrieved Context:
-            {context[:2000]}...
-            
-            Rate the recall from 0.0 to 1.0 based on:
-            1. How much of the needed information is present in the context
-            2. Whether key facts from ground truth are covered
-            3. Completeness of the retrieved information
-            
-            Respond with JSON:
-            {{
-                "recall_score": number,
-                "reasoning": "explanation"
-            }}
-            """
-            
+    def _json_completion(self, instructions: str, content: str) -> Dict[str, Any]:
+        """JSON-mode completion with the static rubric as system message and per-call values last.
+
+        Results are reused for identical prompts via the evaluator's exact-match cache.
+        """
+        def request() -> Dict[str, Any]:
             response = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
+                model=config.EVAL_MODEL,
+                messages=[
+                    {"role": "system", "content": instructions},
+                    {"role": "user", "content": content}
+                ],
                 response_format={"type": "json_object"},
                 temperature=0.2
             )
-            
-            result = json.loads(response.choices[0].message.content)
-            return max(0.0, min(1.0, result.get("recall_score", 0.5)))
-            
-        except Exception as e:
-            st.warning(f"Context recall evaluation failed: {str(e)}")
-            return 0.5
-    
-    def _evaluate_faithfulness(self, response: str, retrieved_docs: List[Dict]) -> float:
-        """Evaluate how faithful the response is to the retrieved context"""
-        if not retrieved_docs:
-            return 0.5
+            return from_json(response.choices[0].message.content)
         
+        if self.semantic_cache is None:
+            return request()
+        return self.semantic_cache.get_or_compute(instructions, content, request)
+    
+    def _evaluate_all(self, query: str, response: str, retrieved_docs: List[Dict],
+                      ground_truth: Optional[str] = None) -> Dict[str, float]:
+        """Score every metric in one JSON-mode request instead of one request per metric"""
+        content = self._evaluate_all_content(query, response, retrieved_docs, ground_truth)
         try:
-            context = "\n".join([doc.get('content', '') for doc in retrieved_docs])
-            
-            prompt = f"""
-            Evaluate how faithful the response is to the provided context.
-            
-            Context:
-            {context[:2000]}...
-            
-            Response: "{response}"
-            
-            Rate the faithfulness from 0.0 to 1.0 based on:
-            1. Whether the response contains information not in the context (hallucination)
-            2. How accurately the response reflects the context
-            3. Whether facts are correctly represented
-            
-            Respond with JSON:
-            {{
-                "faithfulness_score": number,
-                "reasoning": "explanation"
-            }}
-            """
-            
-            response_eval = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.2
-            )
-            
-            result = json.loads(response_eval.choices[0].message.content)
-            return max(0.0, min(1.0, result.get("faithfulness_score", 0.5)))
-            
+            result = self._json_completion(EVALUATE_ALL_INSTRUCTIONS, content)
         except Exception as e:
-            st.warning(f"Faithfulness evaluation failed: {str(e)}")
-            return 0.5
+            st.warning(f"Response evaluation request failed: {str(e)}")
+            result = {}
+        return self._scores_from_result(result, retrieved_docs, ground_truth)
     
-    def _evaluate_answer_relevancy(self, query: str, response: str) -> float:
-        """Evaluate how relevant the response is to the query"""
-        try:
-            prompt = f"""
-            Evaluate how relevant and helpful the response is for the given query.
-            
-            Query: "{query}"
-            Response: "{response}"
-            
-            Rate the relevancy from 0.0 to 1.0 based on:
-            1. How directly the response addresses the query
-            2. Whether the response provides useful information
-            3. How well the response would satisfy the user's need
-            
-            Respond with JSON:
-            {{
-                "relevancy_score": number,
-                "reasoning": "explanation"
-            }}
-            """
-            
-            response_eval = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.2
+    def _evaluate_all_content(self, query: str, response: str, retrieved_docs: List[Dict],
+                              ground_truth: Optional[str] = None) -> str:
+        """Per-call user message for the fused evaluation prompt"""
+        if retrieved_docs:
+            per_doc = max(DOCUMENT_EXCERPT_TOKENS, CONTEXT_TOKENS // len(retrieved_docs))
+            context = "\n\n".join(
+                f"[Document {i + 1}] {doc.get('title', '')}\n{truncate_to_tokens(doc.get('content', ''), per_doc)}"
+                for i, doc in enumerate(retrieved_docs)
             )
-            
-            result = json.loads(response_eval.choices[0].message.content)
-            return max(0.0, min(1.0, result.get("relevancy_score", 0.5)))
-            
-        except Exception as e:
-            st.warning(f"Answer relevancy evaluation failed: {str(e)}")
-            return 0.5
+        else:
+            context = "No documents were retrieved."
+        ground_truth_section = f'\nGround Truth Answer: "{ground_truth}"' if ground_truth else ""
+        
+        return (
+            f"Retrieved Context:\n{context}\n\n"
+            f"Query: \"{query}\"{ground_truth_section}\n"
+            f"Response: \"{response}\""
+        )
     
-    def _evaluate_retrieval_accuracy(self, query: str, retrieved_docs: List[Dict]) -> float:
-        """Evaluate accuracy of document retrieval"""
+    def _scores_from_result(self, result: Dict, retrieved_docs: List[Dict],
+                            ground_truth: Optional[str] = None) -> Dict[str, float]:
+        """Turn the fused evaluation JSON into clamped metric scores; malformed fields fall back to 0.5"""
+        vector_scores = [doc.get('score', 0.5) for doc in retrieved_docs]
+        scores = {
+            metric: unit_score(result.get(metric), 0.5)
+            for metric in ("context_precision", "context_recall", "faithfulness", "answer_relevancy")
+        }
+        
         if not retrieved_docs:
-            return 0.0
+            scores.update(context_precision=0.0, context_recall=0.0, faithfulness=0.5, retrieval_accuracy=0.0)
+            return scores
         
-        try:
-            # Evaluate based on relevance scores and content quality
-            relevance_scores = []
-            
-            for doc in retrieved_docs:
-                doc_score = doc.get('score', 0.5)
-                
-                # Additional content relevance check
-                prompt = f"""
-                Rate how relevant this document is to the query on a scale of 0.0 to 1.0.
-                
-                Query: "{query}"
-                Document Title: "{doc.get('title', '')}"
-                Document Content: "{doc.get('content', '')[:500]}..."
-                
-                Respond with JSON:
-                {{
-                    "relevance_score": number
-                }}
-                """
-                
-                try:
-                    response = self.openai_client.chat.completions.create(
-                        model=config.CHAT_MODEL,
-                        messages=[{"role": "user", "content": prompt}],
-                        response_format={"type": "json_object"},
-                        temperature=0.2
-                    )
-                    
-                    ai_result = json.loads(response.choices[0].message.content)
-                    ai_score = ai_result.get("relevance_score", 0.5)
-                    
-                    # Combine vector similarity score with AI evaluation
-                    combined_score = (doc_score + ai_score) / 2
-                    relevance_scores.append(combined_score)
-                    
-                except:
-                    relevance_scores.append(doc_score)
-            
-            # Calculate weighted average (higher weight for top results)
-            weights = [1.0 / (i + 1) for i in range(len(relevance_scores))]
-            weighted_score = sum(score * weight for score, weight in zip(relevance_scores, weights))
-            total_weight = sum(weights)
-            
-            return weighted_score / total_weight if total_weight > 0 else 0.0
-            
-        except Exception as e:
-            st.warning(f"Retrieval accuracy evaluation failed: {str(e)}")
-            return 0.5
+        if not ground_truth:
+            # Simple heuristic: more relevant docs = better recall
+            scores["context_recall"] = min(1.0, sum(vector_scores) / len(vector_scores) * 1.2)
+        
+        # Combine vector similarity with the model's per-document rating, weighting top results higher
+        document_relevance = result.get("document_relevance")
+        if not isinstance(document_relevance, list):
+            document_relevance = []
+        relevance_scores = [
+            (doc_score + unit_score(document_relevance[i], 0.5)) / 2 if i < len(document_relevance) else doc_score
+            for i, doc_score in enumerate(vector_scores)
+        ]
+        weights = [1.0 / (i + 1) for i in range(len(relevance_scores))]
+        scores["retrieval_accuracy"] = sum(s * w for s, w in zip(relevance_scores, weights)) / sum(weights)
+        return scores
     
     def _calculate_overall_score(self, metrics: Dict[str, float]) -> float:
         """Calculate overall score from individual metrics"""
-        # Weighted average of metrics
-        weights = {
-            "context_precision": 0.2,
-            "faithfulness": 0.3,
-            "answer_relevancy": 0.3,
-            "retrieval_accuracy": 0.2
-        }
-        
-        weighted_sum = sum(metrics.get(metric, 0.0) * weight for metric, weight in weights.items())
-        return weighted_sum
+        values = np.fromiter((metrics.get(metric, 0.0) for metric in SUMMARY_METRICS), dtype=np.float64,
+                             count=len(SUMMARY_METRICS))
+        return float(values @ OVERALL_WEIGHTS)
+    
+    def recompute_overall_scores(self) -> np.ndarray:
+        """Re-derive the stored overall scores from the metric columns (e.g. after changing OVERALL_WEIGHTS)"""
+        with self._log_lock:
+            count = self._score_count
+            self._scores[-1, :count] = OVERALL_WEIGHTS @ self._scores[:-1, :count]
+            return self._scores[-1, :count].copy()
     
     def get_evaluation_summary(self, last_n: int = 10) -> Dict[str, Any]:
         """Get summary of recent evaluations"""
         if not self.evaluation_history:
             return {"message": "No evaluations available"}
         
-        recent_evaluations = self.evaluation_history[-last_n:]
+        # Columnar window over the most recent evaluations: one row per metric, overall score last
+        with self._log_lock:
+            retained = min(self._score_count, len(self.evaluation_history))
+            window = min(last_n, retained) if last_n > 0 else retained
+            recent = self._scores[:, self._score_count - window:self._score_count].copy()
+            last_timestamp = self.evaluation_history[-1]["timestamp"]
         
         # Calculate averages
-        avg_metrics = {}
-        for metric in ["context_precision", "faithfulness", "answer_relevancy", "retrieval_accuracy"]:
-            scores = [eval_result["metrics"].get(metric, 0.0) for eval_result in recent_evaluations]
-            avg_metrics[metric] = sum(scores) / len(scores) if scores else 0.0
+        avg_metrics = dict(zip(SUMMARY_METRICS, recent[:-1].mean(axis=1).tolist()))
+        overall = recent[-1]
         
         # Calculate trends
-        if len(recent_evaluations) >= 5:
-            recent_half = recent_evaluations[len(recent_evaluations)//2:]
-            earlier_half = recent_evaluations[:len(recent_evaluations)//2]
-            
-            recent_avg = sum(eval_result["overall_score"] for eval_result in recent_half) / len(recent_half)
-            earlier_avg = sum(eval_result["overall_score"] for eval_result in earlier_half) / len(earlier_half)
+        if window >= 5:
+            recent_avg = overall[window//2:].mean()
+            earlier_avg = overall[:window//2].mean()
             
             trend = "improving" if recent_avg > earlier_avg + 0.05 else "declining" if recent_avg < earlier_avg - 0.05 else "stable"
         else:
             trend = "insufficient_data"
         
         return {
-            "evaluation_count": len(recent_evaluations),
+            "evaluation_count": window,
             "average_metrics": avg_metrics,
-            "overall_average": sum(eval_result["overall_score"] for eval_result in recent_evaluations) / len(recent_evaluations),
+            "overall_average": float(overall.mean()),
             "trend": trend,
-            "last_evaluation": recent_evaluations[-1]["timestamp"] if recent_evaluations else None
+            "last_evaluation": last_timestamp
         }
     
     def export_evaluation_data(self) -> str:
-        """Export evaluation data as JSON"""
-        return json.dumps(self.evaluation_history, indent=2)
+        """Export the bounded recent history as JSON; the EVAL_LOG_PATH log stays server-side"""
+        with self._log_lock:
+            history = list(self.evaluation_history)
+        return to_json(history, indent=True)
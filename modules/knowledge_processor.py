@@ -1,23 +1,142 @@
-import json
 import os
+import sys
 import time
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Optional
 import streamlit as st
+import config
+from utils.helpers import from_json, to_json_bytes
+
+# Demo articles written when no knowledge base file exists
+SAMPLE_KNOWLEDGE_BASE: Dict = {
+    "articles": [
+        {
+            "id": "kb_001",
+            "title": "How to Reset Your Password",
+            "content": "To reset your password, follow these steps: 1. Go to the login page 2. Click 'Forgot Password' 3. Enter your email address 4. Check your email for reset instructions 5. Follow the link in the email 6. Create a new strong password. If you don't receive the email within 10 minutes, check your spam folder or contact support.",
+            "category": "account_management",
+            "tags": ["password", "reset", "login", "account"],
+            "priority": "high",
+            "last_updated": "2024-01-15"
+        },
+        {
+            "id": "kb_002", 
+            "title": "Billing and Payment Issues",
+            "content": "Common billing issues and solutions: Payment failed - Check if your card details are correct and up to date. Unexpected charges - Review your subscription plan and any add-ons. Refund requests - Contact support within 30 days with your order number. Payment methods - We accept major credit cards, PayPal, and bank transfers. For enterprise customers, we also offer invoicing options.",
+            "category": "billing",
+            "tags": ["billing", "payment", "refund", "subscription", "charges"],
+            "priority": "high",
+            "last_updated": "2024-01-20"
+        },
+        {
+            "id": "kb_003",
+            "title": "Account Suspension and Recovery", 
+            "content": "If your account has been suspended: 1. Check your email for suspension notification 2. Common reasons include policy violations, payment issues, or security concerns 3. Contact support immediately with your account details 4. Provide any requested documentation 5. Follow the recovery process outlined in our email 6. Account recovery typically takes 2-5 business days. Prevent future suspensions by keeping your account information current and following our terms of service.",
+            "category": "account_management",
+            "tags": ["suspension", "account", "recovery", "policy", "security"],
+            "priority": "critical",
+            "last_updated": "2024-01-18"
+        },
+        {
+            "id": "kb_004",
+            "title": "Technical Support and Troubleshooting",
+            "content": "Basic troubleshooting steps: 1. Clear your browser cache and cookies 2. Try using an incognito/private browser window 3. Disable browser extensions temporarily 4. Check your internet connection 5. Try accessing from a different device or browser 6. Update your browser to the latest version. If problems persist, contact technical support with details about your device, browser, and the specific error you're experiencing.",
+            "category": "technical_support",
+            "tags": ["troubleshooting", "technical", "browser", "cache", "error"],
+            "priority": "medium",
+            "last_updated": "2024-01-10"
+        },
+        {
+            "id": "kb_005",
+            "title": "Privacy and Data Protection",
+            "content": "We take your privacy seriously. Your data protection rights include: Access - Request copies of your personal data. Correction - Request correction of inaccurate data. Deletion - Request deletion of your data (right to be forgotten). Portability - Request transfer of your data. We use industry-standard encryption and security measures. Data is stored securely and never sold to third parties. For privacy concerns or data requests, contact our privacy team at privacy@company.com.",
+            "category": "privacy",
+            "tags": ["privacy", "data", "security", "GDPR", "rights"],
+            "priority": "medium",
+            "last_updated": "2024-01-12"
+        },
+        {
+            "id": "kb_006",
+            "title": "Subscription Management and Plans",
+            "content": "Manage your subscription: Upgrade/Downgrade - Changes take effect at next billing cycle. Cancel subscription - You can cancel anytime; access continues until period end. Plan comparison - Basic ($9/month), Pro ($19/month), Enterprise (custom pricing). Features include: Basic (core features), Pro (advanced features + priority support), Enterprise (all features + dedicated support + custom integrations). Contact sales for enterprise pricing and custom solutions.",
+            "category": "subscription",
+            "tags": ["subscription", "plans", "upgrade", "cancel", "pricing"],
+            "priority": "high",
+            "last_updated": "2024-01-25"
+        },
+        {
+            "id": "kb_007",
+            "title": "API Documentation and Integration",
+            "content": "API integration guide: 1. Obtain API key from your dashboard 2. Authentication uses Bearer token in headers 3. Base URL: https://api.example.com/v1 4. Rate limits: 1000 requests/hour for Basic, 5000/hour for Pro 5. Key endpoints: /users, /data, /analytics 6. Response format is JSON with standard HTTP status codes 7. SDKs available for Python, JavaScript, and PHP. For technical integration support, contact our developer support team.",
+            "category": "technical_support",
+            "tags": ["API", "integration", "developer", "authentication", "documentation"],
+            "priority": "medium",
+            "last_updated": "2024-01-22"
+        },
+        {
+            "id": "kb_008",
+            "title": "Refund and Cancellation Policy",
+            "content": "Refund policy: 30-day money-back guarantee for new subscriptions. Cancellation policy: Cancel anytime, no cancellation fees. Refund process: 1. Contact support within 30 days 2. Provide order number and reason 3. Refunds processed within 5-7 business days 4. Refunds issued to original payment method. Exceptions: Setup fees for enterprise plans are non-refundable. Partial refunds available for annual plans if cancelled within first 30 days.",
+            "category": "billing",
+            "tags": ["refund", "cancellation", "policy", "money-back", "guarantee"],
+            "priority": "high",
+            "last_updated": "2024-01-20"
+        },
+        {
+            "id": "kb_009",
+            "title": "Security Best Practices",
+            "content": "Keep your account secure: 1. Use strong, unique passwords 2. Enable two-factor authentication (2FA) 3. Regularly review account activity 4. Don't share login credentials 5. Log out from shared devices 6. Report suspicious activity immediately 7. Keep contact information updated 8. Use official company communications only. If you suspect account compromise, change your password immediately and contact security team at security@company.com.",
+            "category": "security",
+            "tags": ["security", "password", "2FA", "best-practices", "account-safety"],
+            "priority": "high",
+            "last_updated": "2024-01-15"
+        },
+        {
+            "id": "kb_010",
+            "title": "Contact Information and Support Hours",
+            "content": "Get support when you need it: Email support: support@company.com (24/7). Live chat: Available Mon-Fri 9AM-6PM EST. Phone support: +1-800-123-4567 (Pro and Enterprise only). Emergency support: For critical issues, mark emails as 'URGENT'. Response times: Basic (48 hours), Pro (24 hours), Enterprise (4 hours). Self-service: Check our knowledge base first for quick answers. Status page: status.company.com for service updates.",
+            "category": "support",
+            "tags": ["contact", "support", "hours", "email", "phone", "chat"],
+            "priority": "critical",
+            "last_updated": "2024-01-28"
+        }
+    ]
+}
+
+# Article fields that end up in vector-store embeddings or metadata
+INDEXED_FIELDS = ("title", "content", "category", "tags")
+
+# Serialized once; parsing it back is a cheap deep copy for callers that mutate the result
+_SAMPLE_KNOWLEDGE_BASE_JSON = to_json_bytes(SAMPLE_KNOWLEDGE_BASE)
 
 class KnowledgeProcessor:
-    def __init__(self):
-        """Initialize knowledge processor"""
+    def __init__(self, vector_store=None):
+        """Initialize knowledge processor (the vector store is created on first use if not given)"""
         self.knowledge_base_path = "data/sample_knowledge_base.json"
         self.processed_docs = []
+        self._vector_store = vector_store
+        
+        # Parsed knowledge base, reused until the file's mtime changes, and
+        # the position of each article id in its list
+        self._cache = None
+        self._cache_mtime = None
+        self._id_index: Dict[str, int] = {}
+        
+        # get_article_stats result for the cached data, recomputed when it or the date changes
+        self._stats: Optional[Dict] = None
+        self._stats_date: Optional[str] = None
     
-    def load_knowledge_base(self) -> bool:
-        """Load and process knowledge base documents"""
+    def load_knowledge_base(self, vector_store=None, use_batch_api: bool = False) -> bool:
+        """Load and process knowledge base documents.
+
+        With ``use_batch_api``, large loads (EMBEDDING_BATCH_THRESHOLD documents or
+        more) are embedded through an OpenAI Batch job instead; the articles are
+        indexed once ``vector_store.poll_embedding_batch`` sees it complete.
+        """
         try:
             # Load from file if exists
-            if os.path.exists(self.knowledge_base_path):
-                with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
-                    knowledge_data = json.load(f)
-            else:
+            knowledge_data = self._load_cached()
+            if knowledge_data is None:
                 # Create sample knowledge base if file doesn't exist
                 knowledge_data = self._create_sample_knowledge_base()
                 self._save_knowledge_base(knowledge_data)
@@ -26,8 +145,13 @@ class KnowledgeProcessor:
             self.processed_docs = self._process_documents(knowledge_data.get('articles', []))
             
             # Store in vector database
-            from modules.vector_store import VectorStore
-            vector_store = VectorStore()
+            if vector_store is None:
+                vector_store = self._get_vector_store()
+            if use_batch_api and len(self.processed_docs) >= config.EMBEDDING_BATCH_THRESHOLD:
+                batch_id = vector_store.submit_embedding_batch(self.processed_docs)
+                if batch_id is not None:
+                    st.info(f"Submitted embedding batch {batch_id} for {len(self.processed_docs)} documents")
+                    return True
             success = vector_store.upsert_documents(self.processed_docs)
             
             if success:
@@ -43,161 +167,89 @@ class KnowledgeProcessor:
     
     def _create_sample_knowledge_base(self) -> Dict:
         """Create sample knowledge base for demonstration"""
-        return {
-            "articles": [
-                {
-                    "id": "kb_001",
-                    "title": "How to Reset Your Password",
-                    "content": "To reset your password, follow these steps: 1. Go to the login page 2. Click 'Forgot Password' 3. Enter your email address 4. Check your email for reset instructions 5. Follow the link in the email 6. Create a new strong password. If you don't receive the email within 10 minutes, check your spam folder or contact support.",
-                    "category": "account_management",
-                    "tags": ["password", "reset", "login", "account"],
-                    "priority": "high",
-                    "last_updated": "2024-01-15"
-                },
-                {
-                    "id": "kb_002", 
-                    "title": "Billing and Payment Issues",
-                    "content": "Common billing issues and solutions: Payment failed - Check if your card details are correct and up to date. Unexpected charges - Review your subscription plan and any add-ons. Refund requests - Contact support within 30 days with your order number. Payment methods - We accept major credit cards, PayPal, and bank transfers. For enterprise customers, we also offer invoicing options.",
-                    "category": "billing",
-                    "tags": ["billing", "payment", "refund", "subscription", "charges"],
-                    "priority": "high",
-                    "last_updated": "2024-01-20"
-                },
-                {
-                    "id": "kb_003",
-                    "title": "Account Suspension and Recovery", 
-                    "content": "If your account has been suspended: 1. Check your email for suspension notification 2. Common reasons include policy violations, payment issues, or security concerns 3. Contact support immediately with your account details 4. Provide any requested documentation 5. Follow the recovery process outlined in our email 6. Account recovery typically takes 2-5 business days. Prevent future suspensions by keeping your account information current and following our terms of service.",
-                    "category": "account_management",
-                    "tags": ["suspension", "account", "recovery", "policy", "security"],
-                    "priority": "critical",
-                    "last_updated": "2024-01-18"
-                },
-                {
-                    "id": "kb_004",
-                    "title": "Technical Support and Troubleshooting",
-                    "content": "Basic troubleshooting steps: 1. Clear your browser cache and cookies 2. Try using an incognito/private browser window 3. Disable browser extensions temporarily 4. Check your internet connection 5. Try accessing from a different device or browser 6. Update your browser to the latest version. If problems persist, contact technical support with details about your device, browser, and the specific error you're experiencing.",
-                    "category": "technical_support",
-                    "tags": ["troubleshooting", "technical", "browser", "cache", "error"],
-                    "priority": "medium",
-                    "last_updated": "2024-01-10"
-                },
-                {
-                    "id": "kb_005",
-                    "title": "Privacy and Data Protection",
-                    "content": "We take your privacy seriously. Your data protection rights include: Access - Request copies of your personal data. Correction - Request correction of inaccurate data. Deletion - Request deletion of your data (right to be forgotten). Portability - Request transfer of your data. We use industry-standard encryption and security measures. Data is stored securely and never sold to third parties. For privacy concerns or data requests, contact our privacy team at privacy@company.com.",
-                    "category": "privacy",
-                    "tags": ["privacy", "data", "security", "GDPR", "rights"],
-                    "priority": "medium",
-                    "last_updated": "2024-01-12"
-                },
-                {
-                    "id": "kb_006",
-                    "title": "Subscription Management and Plans",
-                    "content": "Manage your subscription: Upgrade/Downgrade - Changes take effect at next billing cycle. Cancel subscription - You can cancel anytime; access continues until period end. Plan comparison - Basic ($9/month), Pro ($19/month), Enterprise (custom pricing). Features include: Basic (core features), Pro (advanced features + priority support), Enterprise (all features + dedicated support + custom integrations). Contact sales for enterprise pricing and custom solutions.",
-                    "category": "subscription",
-                    "tags": ["subscription", "plans", "upgrade", "cancel", "pricing"],
-                    "priority": "high",
-                    "last_updated": "2024-01-25"
-                },
-                {
-                    "id": "kb_007",
-                    "title": "API Documentation and Integration",
-                    "content": "API integration guide: 1. Obtain API key from your dashboard 2. Authentication uses Bearer token in headers 3. Base URL: https://api.example.com/v1 4. Rate limits: 1000 requests/hour for Basic, 5000/hour for Pro 5. Key endpoints: /users, /data, /analytics 6. Response format is JSON with standard HTTP status codes 7. SDKs available for Python, JavaScript, and PHP. For technical integration support, contact our developer support team.",
-                    "category": "technical_support",
-                    "tags": ["API", "integration", "developer", "authentication", "documentation"],
-                    "priority": "medium",
-                    "last_updated": "2024-01-22"
-                },
-                {
-                    "id": "kb_008",
-                    "title": "Refund and Cancellation Policy",
-                    "content": "Refund policy: 30-day money-back guarantee for new subscriptions. Cancellation policy: Cancel anytime, no cancellation fees. Refund process: 1. Contact support within 30 days 2. Provide order number and reason 3. Refunds processed within 5-7 business days 4. Refunds issued to original payment method. Exceptions: Setup fees for enterprise plans are non-refundable. Partial refunds available for annual plans if cancelled within first 30 days.",
-                    "category": "billing",
-                    "tags": ["refund", "cancellation", "policy", "money-back", "guarantee"],
-                    "priority": "high",
-                    "last_updated": "2024-01-20"
-                },
-                {
-                    "id": "kb_009",
-                    "title": "Security Best Practices",
-                    "content": "Keep your account secure: 1. Use strong, unique passwords 2. Enable two-factor authentication (2FA) 3. Regularly review account activity 4. Don't share login credentials 5. Log out from shared devices 6. Report suspicious activity immediately 7. Keep contact information updated 8. Use official company communications only. If you suspect account compromise, change your password immediately and contact security team at security@company.com.",
-                    "category": "security",
-                    "tags": ["security", "password", "2FA", "best-practices", "account-safety"],
-                    "priority": "high",
-                    "last_updated": "2024-01-15"
-                },
-                {
-                    "id": "kb_010",
-                    "title": "Contact Information and Support Hours",
-                    "content": "Get support when you need it: Email support: support@company.com (24/7). Live chat: Available Mon-Fri 9AM-6PM EST. Phone support: +1-800-123-4567 (Pro and Enterprise only). Emergency support: For critical issues, mark emails as 'URGENT'. Response times: Basic (48 hours), Pro (24 hours), Enterprise (4 hours). Self-service: Check our knowledge base first for quick answers. Status page: status.company.com for service updates.",
-                    "category": "support",
-                    "tags": ["contact", "support", "hours", "email", "phone", "chat"],
-                    "priority": "critical",
-                    "last_updated": "2024-01-28"
-                }
-            ]
-        }
+        return from_json(_SAMPLE_KNOWLEDGE_BASE_JSON)
     
     def _process_documents(self, articles: List[Dict]) -> List[Dict]:
         """Process articles for vector storage with basic word chunking & overlap."""
         processed: List[Dict] = []
         chunk_size = 120  # words
         overlap = 20      # words overlap
+        step = chunk_size - overlap
+        now = time.time()
 
         for article in articles:
-            base_id = article.get("id", f"doc_{int(time.time())}")
-            title = article.get("title", "")
-            content = article.get("content", "")
-            words = content.split()
-            if len(words) == 0:
+            words = article.get("content", "").split()
+            if not words:
                 continue
-            chunks = []
-            start = 0
-            while start < len(words):
-                end = min(len(words), start + chunk_size)
-                chunk_words = words[start:end]
-                chunk_text = " ".join(chunk_words)
-                chunk_id = f"{base_id}_chunk_{len(chunks)}"
-                searchable_content = f"{title} {chunk_text}"
-                processed.append({
-                    "id": chunk_id,
-                    "title": title,
-                    "content": searchable_content,
-                    "category": article.get("category", "general"),
-                    "tags": article.get("tags", []),
-                    "priority": article.get("priority", "medium"),
-                    "created_at": time.time(),
-                    "last_updated": article.get("last_updated", ""),
-                    "parent_id": base_id,
-                    "chunk_index": len(chunks),
-                    "total_chunks": None  # fill later
-                })
-                chunks.append(chunk_id)
-                if end == len(words):
-                    break
-                start = end - overlap  # overlap
-            # Fill total_chunks
-            for doc in processed[-len(chunks):]:
-                doc["total_chunks"] = len(chunks)
+            base_id = article.get("id", f"doc_{int(now)}")
+            title = article.get("title", "")
+            # Fields shared by every chunk of the article; repeated labels share one string
+            shared = {
+                "title": title,
+                "category": sys.intern(article.get("category", "general")),
+                "tags": article.get("tags", []),
+                "priority": sys.intern(article.get("priority", "medium")),
+                "created_at": now,
+                "last_updated": article.get("last_updated", ""),
+                "parent_id": base_id
+            }
+            # Window starts: the last window is the first one reaching the final word
+            starts = range(0, max(len(words) - overlap, 1), step)
+            processed.extend(
+                {
+                    "id": f"{base_id}_chunk_{index}",
+                    "content": f"{title} {' '.join(words[start:start + chunk_size])}",
+                    **shared,
+                    "chunk_index": index,
+                    "total_chunks": len(starts)
+                }
+                for index, start in enumerate(starts)
+            )
         return processed
     
+    def _get_vector_store(self):
+        """Vector store shared by every mutating method, created once"""
+        if self._vector_store is None:
+            from modules.vector_store import create_vector_store  # lazy: vector_store imports this module
+            self._vector_store = create_vector_store()
+        return self._vector_store
+    
+    def _load_cached(self) -> Optional[Dict]:
+        """Parsed knowledge base file (None if missing), re-read only when its mtime changes"""
+        try:
+            mtime = os.stat(self.knowledge_base_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if self._cache is None or mtime != self._cache_mtime:
+            with open(self.knowledge_base_path, 'rb') as f:
+                self._set_cache(from_json(f.read()), mtime)
+        return self._cache
+    
+    def _set_cache(self, data: Dict, mtime: int):
+        """Remember parsed data for the given mtime and index its article ids"""
+        self._cache = data
+        self._cache_mtime = mtime
+        self._id_index = {article["id"]: i for i, article in enumerate(data.get("articles", []))}
+        self._stats = None
+    
     def _save_knowledge_base(self, data: Dict):
         """Save knowledge base to file"""
         try:
             os.makedirs(os.path.dirname(self.knowledge_base_path), exist_ok=True)
-            with open(self.knowledge_base_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(self.knowledge_base_path, 'wb') as f:
+                f.write(to_json_bytes(data, indent=True))
+            self._set_cache(data, os.stat(self.knowledge_base_path).st_mtime_ns)
         except Exception as e:
+            # The caller may have edited the cached dict in place; force a re-read
+            self._cache = None
             st.error(f"Failed to save knowledge base: {str(e)}")
     
     def add_article(self, article: Dict) -> bool:
         """Add new article to knowledge base"""
         try:
             # Load existing data
-            if os.path.exists(self.knowledge_base_path):
-                with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            else:
+            data = self._load_cached()
+            if data is None:
                 data = {"articles": []}
             
             # Add new article
@@ -210,8 +262,7 @@ class KnowledgeProcessor:
             
             # Process and store in vector database
             processed_doc = self._process_documents([article])[0]
-            from modules.vector_store import VectorStore
-            vector_store = VectorStore()
+            vector_store = self._get_vector_store()
             return vector_store.upsert_documents([processed_doc])
             
         except Exception as e:
@@ -221,29 +272,29 @@ class KnowledgeProcessor:
     def update_article(self, article_id: str, updated_data: Dict) -> bool:
         """Update existing article"""
         try:
-            if not os.path.exists(self.knowledge_base_path):
+            data = self._load_cached()
+            if data is None:
                 return False
             
-            with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
             # Find and update article
-            for i, article in enumerate(data["articles"]):
-                if article["id"] == article_id:
-                    data["articles"][i].update(updated_data)
-                    data["articles"][i]["last_updated"] = time.strftime("%Y-%m-%d")
-                    break
-            else:
+            i = self._id_index.get(article_id)
+            if i is None:
                 return False
+            updated_article = data["articles"][i]
+            indexed_before = [updated_article.get(field) for field in INDEXED_FIELDS]
+            updated_article.update(updated_data)
+            updated_article["last_updated"] = time.strftime("%Y-%m-%d")
             
             # Save updated data
             self._save_knowledge_base(data)
             
+            # Nothing stored in the vector database changed (e.g. only priority): skip re-embedding
+            if [updated_article.get(field) for field in INDEXED_FIELDS] == indexed_before:
+                return True
+            
             # Update in vector database
-            updated_article = next(a for a in data["articles"] if a["id"] == article_id)
             processed_doc = self._process_documents([updated_article])[0]
-            from modules.vector_store import VectorStore
-            vector_store = VectorStore()
+            vector_store = self._get_vector_store()
             return vector_store.upsert_documents([processed_doc])
             
         except Exception as e:
@@ -253,21 +304,21 @@ class KnowledgeProcessor:
     def delete_article(self, article_id: str) -> bool:
         """Delete article from knowledge base"""
         try:
-            if not os.path.exists(self.knowledge_base_path):
+            data = self._load_cached()
+            if data is None:
                 return False
             
-            with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Remove article
-            data["articles"] = [a for a in data["articles"] if a["id"] != article_id]
+            # Remove article in place (saving re-indexes the shifted positions)
+            i = self._id_index.get(article_id)
+            if i is None:
+                return False
+            data["articles"].pop(i)
             
             # Save updated data
             self._save_knowledge_base(data)
             
             # Delete from vector database
-            from modules.vector_store import VectorStore
-            vector_store = VectorStore()
+            vector_store = self._get_vector_store()
             return vector_store.delete_document(article_id)
             
         except Exception as e:
@@ -277,39 +328,28 @@ class KnowledgeProcessor:
     def get_article_stats(self) -> Dict:
         """Get knowledge base statistics"""
         try:
-            if not os.path.exists(self.knowledge_base_path):
+            data = self._load_cached()
+            if data is None:
                 return {}
             
-            with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            articles = data.get("articles", [])
-            
-            # Calculate statistics
-            stats = {
-                "total_articles": len(articles),
-                "categories": {},
-                "priorities": {},
-                "recent_updates": 0
-            }
-            
             current_date = time.strftime("%Y-%m-%d")
+            if self._stats is None or self._stats_date != current_date:
+                articles = data.get("articles", [])
+                self._stats = {
+                    "total_articles": len(articles),
+                    "categories": dict(Counter(article.get("category", "unknown") for article in articles)),
+                    "priorities": dict(Counter(article.get("priority", "medium") for article in articles)),
+                    # Articles updated today
+                    "recent_updates": sum(article.get("last_updated", "") == current_date for article in articles)
+                }
+                self._stats_date = current_date
             
-            for article in articles:
-                # Category distribution
-                category = article.get("category", "unknown")
-                stats["categories"][category] = stats["categories"].get(category, 0) + 1
-                
-                # Priority distribution
-                priority = article.get("priority", "medium")
-                stats["priorities"][priority] = stats["priorities"].get(priority, 0) + 1
-                
-                # Recent updates (within last 7 days)
-                last_updated = article.get("last_updated", "")
-                if last_updated == current_date:
-                    stats["recent_updates"] += 1
-            
-            return stats
+            # Copy the histograms so callers can't modify the memoized result
+            return {
+                **self._stats,
+                "categories": dict(self._stats["categories"]),
+                "priorities": dict(self._stats["priorities"])
+            }
             
         except Exception as e:
             st.error(f"Failed to get article stats: {str(e)}")
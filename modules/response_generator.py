@@ -1,14 +1,92 @@
 import json
 import time
-from typing import List, Dict, Any
-from openai import OpenAI
+from bisect import bisect_right
+from typing import List, Dict, Any, Iterator
 import streamlit as st
 import config
+from modules.semantic_cache import SemanticCache
+from utils.helpers import get_openai_client, openai_reachable, to_json, truncate_to_tokens
+
+# Default tone by sentiment band: < 0.3 (depends on emotion), < 0.5, < 0.7, otherwise
+TONE_SENTIMENT_BOUNDS = (0.3, 0.5, 0.7)
+TONE_BY_SENTIMENT = (None, "empathetic", "professional", "reassuring")
+
+# Prompt templates are built once at import; call sites only fill the fields
+RESPONSE_SYSTEM_PROMPT = (
+    "You are an expert customer support representative. "
+    "Provide helpful, empathetic, and professional responses. "
+    "Always acknowledge the customer's feelings and provide clear solutions."
+)
+
+RESPONSE_PROMPT = """You are a customer support AI assistant. Generate a helpful, {tone_description} response to the customer.
+
+Customer's current message: "{customer_message}"
+
+Customer sentiment analysis:
+- Sentiment score: {sentiment_score:.2f} (0=very negative, 1=very positive)
+- Primary emotion: {primary_emotion}
+- Urgency level: {urgency:.2f}
+
+Recent conversation context:
+{recent_context}
+
+Relevant knowledge base information:
+{context}
+
+Guidelines for your response:
+1. Be {tone_description}
+2. Address the customer's specific concern directly
+3. Use information from the knowledge base when relevant
+4. Show empathy appropriate to their emotional state
+5. Provide clear, actionable next steps
+6. Keep response concise but complete (aim for 2-3 sentences)
+7. If escalation is needed, acknowledge their frustration and offer escalation
+
+Generate a response that feels natural and human-like:"""
+
+CALIBRATION_PROMPT = """Adjust the tone of this customer support response to be more appropriate for achieving a target sentiment of {target_sentiment:.2f} (0=negative, 1=positive).
+
+Original response: "{base_response}"
+Current tone: {current_tone}
+
+Guidelines:
+- If target sentiment is low (< 0.4), be more apologetic and empathetic
+- If target sentiment is high (> 0.7), be more positive and reassuring
+- Maintain the same factual content and helpfulness
+- Keep the response length similar
+
+Provide the adjusted response:"""
+
+ESCALATION_GUIDANCE = {
+    "medium": "The customer seems moderately frustrated. Acknowledge their concern and offer additional assistance.",
+    "high": "The customer is quite frustrated. Show empathy, apologize if appropriate, and consider escalation options.",
+    "critical": "The customer is very upset and likely to escalate. Provide immediate empathy, sincere apology, and escalation path."
+}
+
+ESCALATION_PROMPT = """Generate an escalation-appropriate response for this customer support scenario.
+
+Escalation level: {escalation_level}
+Customer message: "{customer_message}"
+
+{guidance}
+
+The response should:
+1. Acknowledge their frustration appropriately
+2. Take responsibility where applicable
+3. Offer concrete next steps
+4. Show genuine care for their experience
+
+Generate a response:"""
 
 class ResponseGenerator:
     def __init__(self):
         """Initialize response generator with OpenAI client"""
-        self.openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
+        
+        # Replies for byte-identical prompts (same message, context, history and tone)
+        self.response_cache = (
+            SemanticCache(None, max_entries=config.RESPONSE_CACHE_SIZE) if config.RESPONSE_CACHE_SIZE > 0 else None
+        )
         
         # Response tone styles
         self.tone_styles = {
@@ -26,8 +104,12 @@ class ResponseGenerator:
         }
     
     def generate_response(self, customer_message: str, retrieved_docs: List[Dict], 
-                         conversation_history: List[Dict], sentiment_data: Dict, satisfaction_avg: float | None = None) -> Dict[str, Any]:
-        """Generate empathetic and contextually appropriate response"""
+                         conversation_history: List[Dict], sentiment_data: Dict, satisfaction_avg: float | None = None,
+                         stream: bool = False) -> Dict[str, Any]:
+        """Generate empathetic and contextually appropriate response.
+
+        With ``stream=True`` the "response" entry is a generator of text chunks.
+        """
         try:
             # Determine appropriate tone based on sentiment and escalation risk
             tone = self._determine_response_tone(sentiment_data, conversation_history, satisfaction_avg)
@@ -36,7 +118,8 @@ class ResponseGenerator:
             context = self._prepare_context(retrieved_docs)
             
             # Generate response using AI
-            response = self._generate_ai_response(
+            generate = self._stream_ai_response if stream else self._generate_ai_response
+            response = generate(
                 customer_message, context, conversation_history, tone, sentiment_data
             )
             
@@ -49,8 +132,9 @@ class ResponseGenerator:
             
         except Exception as e:
             st.error(f"Response generation failed: {str(e)}")
+            fallback = "I apologize, but I'm having trouble processing your request right now. Let me connect you with a human agent who can assist you better."
             return {
-                "response": "I apologize, but I'm having trouble processing your request right now. Let me connect you with a human agent who can assist you better.",
+                "response": iter([fallback]) if stream else fallback,
                 "tone": "apologetic",
                 "context_used": 0,
                 "generation_timestamp": time.time()
@@ -73,95 +157,121 @@ class ResponseGenerator:
         if urgency > 0.8:
             return "urgent"
         
-        # Very negative sentiment
-        if sentiment_score < 0.3:
-            if primary_emotion in ['anger', 'frustration']:
-                return "empathetic"
-            else:
-                return "apologetic"
-        
-        # Negative sentiment
-        elif sentiment_score < 0.5:
-            return "empathetic"
-        
-        # Neutral to positive sentiment
-        elif sentiment_score < 0.7:
-            return "professional"
-        
-        # Very positive sentiment
-        else:
-            return "reassuring"
+        # Very negative sentiment: tone depends on the emotion
+        band = bisect_right(TONE_SENTIMENT_BOUNDS, sentiment_score)
+        if band == 0:
+            return "empathetic" if primary_emotion in ('anger', 'frustration') else "apologetic"
+        return TONE_BY_SENTIMENT[band]
     
     def _prepare_context(self, retrieved_docs: List[Dict]) -> str:
         """Prepare context from retrieved documents"""
         if not retrieved_docs:
             return "No specific knowledge base articles found for this query."
         
-        context_parts = []
-        for i, doc in enumerate(retrieved_docs[:3]):  # Use top 3 most relevant
-            context_parts.append(f"Article {i+1}: {doc['title']}\n{doc['content'][:500]}...")
+        # Use top 3 most relevant
+        return "\n\n".join(
+            f"Article {i+1}: {doc['title']}\n{doc['content'][:500]}..."
+            for i, doc in enumerate(retrieved_docs[:3])
+        )
+    
+    def _build_messages(self, customer_message: str, context: str, 
+                        conversation_history: List[Dict], tone: str, sentiment_data: Dict) -> List[Dict]:
+        """Build the chat messages for response generation"""
+        # Prepare conversation context; MAX_CONTEXT_LENGTH tokens are split between the
+        # knowledge base context (half) and the latest history and message (a quarter each)
+        budget = config.MAX_CONTEXT_LENGTH
+        recent_context = truncate_to_tokens(
+            self._format_conversation_context(conversation_history[-4:]), budget // 4, keep_end=True
+        )
+        context = truncate_to_tokens(context, budget // 2)
+        customer_message = truncate_to_tokens(customer_message, budget // 4)
+
+        # Get tone description
+        tone_description = self.tone_styles.get(tone, "professional and helpful")
+
+        # Build comprehensive prompt
+        prompt = RESPONSE_PROMPT.format(
+            tone_description=tone_description,
+            customer_message=customer_message,
+            sentiment_score=sentiment_data.get('sentiment_score', 0.5),
+            primary_emotion=sentiment_data.get('primary_emotion', 'neutral'),
+            urgency=sentiment_data.get('urgency', 0.5),
+            recent_context=recent_context,
+            context=context
+        )
         
-        return "\n\n".join(context_parts)
+        return [
+            {"role": "system", "content": RESPONSE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
     
     def _generate_ai_response(self, customer_message: str, context: str, 
                              conversation_history: List[Dict], tone: str, sentiment_data: Dict) -> str:
         """Generate AI response with appropriate tone and context"""
         try:
-            # Prepare conversation context
-            recent_context = self._format_conversation_context(conversation_history[-4:])
-            
-            # Get tone description
-            tone_description = self.tone_styles.get(tone, "professional and helpful")
-            
-            # Build comprehensive prompt
-            prompt = f"""
-            You are a customer support AI assistant. Generate a helpful, {tone_description} response to the customer.
-            
-            Customer's current message: "{customer_message}"
-            
-            Customer sentiment analysis:
-            - Sentiment score: {sentiment_data.get('sentiment_score', 0.5):.2f} (0=very negative, 1=very positive)
-            - Primary emotion: {sentiment_data.get('primary_emotion', 'neutral')}
-            - Urgency level: {sentiment_data.get('urgency', 0.5):.2f}
-            
-            Recent conversation context:
-            {recent_context}
+            return self._cached_completion(
+                "response",
+                self._build_messages(customer_message, context, conversation_history, tone, sentiment_data),
+                config.TEMPERATURE
+            )
             
-            Relevant knowledge base information:
-            {context}
+        except Exception as e:
+            st.error(f"AI response generation failed: {str(e)}")
+            return self._generate_fallback_response(customer_message, tone)
+    
+    def _stream_ai_response(self, customer_message: str, context: str, 
+                            conversation_history: List[Dict], tone: str, sentiment_data: Dict) -> Iterator[str]:
+        """Yield the AI response as it is generated (the request starts on first iteration)"""
+        produced = False
+        try:
+            messages = self._build_messages(customer_message, context, conversation_history, tone, sentiment_data)
+            cache_text = self._cache_text(messages, config.TEMPERATURE)
+            cached = self.response_cache.get("response", cache_text) if self.response_cache else None
+            if cached is not None:
+                yield cached
+                return
             
-            Guidelines for your response:
-            1. Be {tone_description}
-            2. Address the customer's specific concern directly
-            3. Use information from the knowledge base when relevant
-            4. Show empathy appropriate to their emotional state
-            5. Provide clear, actionable next steps
-            6. Keep response concise but complete (aim for 2-3 sentences)
-            7. If escalation is needed, acknowledge their frustration and offer escalation
+            stream = self.openai_client.chat.completions.create(
+                model=config.CHAT_MODEL,
+                messages=messages,
+                temperature=config.TEMPERATURE,
+                max_tokens=config.MAX_RESPONSE_LENGTH,
+                stream=True
+            )
+            parts = []
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    produced = True
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
             
-            Generate a response that feels natural and human-like:
-            """
+            # Only complete replies are cached
+            if parts and self.response_cache is not None:
+                self.response_cache.put("response", cache_text, "".join(parts).strip())
             
+        except Exception as e:
+            st.error(f"AI response generation failed: {str(e)}")
+            if not produced:
+                yield self._generate_fallback_response(customer_message, tone)
+    
+    def _cache_text(self, messages: List[Dict], temperature: float) -> str:
+        """Canonical form of a generation request, used as the reply-cache key"""
+        return to_json([config.CHAT_MODEL, temperature, config.MAX_RESPONSE_LENGTH, messages])
+    
+    def _cached_completion(self, namespace: str, messages: List[Dict], temperature: float) -> str:
+        """Chat completion text, reused for identical requests when the reply cache is enabled"""
+        def request() -> str:
             response = self.openai_client.chat.completions.create(
                 model=config.CHAT_MODEL,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert customer support representative. "
-                        "Provide helpful, empathetic, and professional responses. "
-                        "Always acknowledge the customer's feelings and provide clear solutions."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=config.TEMPERATURE,
+                messages=messages,
+                temperature=temperature,
                 max_tokens=config.MAX_RESPONSE_LENGTH
             )
-            
             return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            st.error(f"AI response generation failed: {str(e)}")
-            return self._generate_fallback_response(customer_message, tone)
+        
+        if self.response_cache is None:
+            return request()
+        return self.response_cache.get_or_compute(namespace, self._cache_text(messages, temperature), request)
     
     def _format_conversation_context(self, recent_messages: List[Dict]) -> str:
         """Format recent conversation for context"""
@@ -194,29 +304,11 @@ class ResponseGenerator:
             if abs(target_sentiment - 0.7) < 0.1:  # Target is neutral-positive
                 return base_response
             
-            prompt = f"""
-            Adjust the tone of this customer support response to be more appropriate for achieving a target sentiment of {target_sentiment:.2f} (0=negative, 1=positive).
-            
-            Original response: "{base_response}"
-            Current tone: {current_tone}
-            
-            Guidelines:
-            - If target sentiment is low (< 0.4), be more apologetic and empathetic
-            - If target sentiment is high (> 0.7), be more positive and reassuring
-            - Maintain the same factual content and helpfulness
-            - Keep the response length similar
-            
-            Provide the adjusted response:
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=config.MAX_RESPONSE_LENGTH
+            prompt = CALIBRATION_PROMPT.format(
+                target_sentiment=target_sentiment, base_response=base_response, current_tone=current_tone
             )
             
-            return response.choices[0].message.content.strip()
+            return self._cached_completion("calibration", [{"role": "user", "content": prompt}], 0.5)
             
         except Exception as e:
             st.error(f"Tone calibration failed: {str(e)}")
@@ -225,37 +317,13 @@ class ResponseGenerator:
     def generate_escalation_response(self, escalation_level: str, customer_message: str) -> str:
         """Generate specific response for escalation scenarios"""
         try:
-            escalation_prompts = {
-                "medium": "The customer seems moderately frustrated. Acknowledge their concern and offer additional assistance.",
-                "high": "The customer is quite frustrated. Show empathy, apologize if appropriate, and consider escalation options.",
-                "critical": "The customer is very upset and likely to escalate. Provide immediate empathy, sincere apology, and escalation path."
-            }
-            
-            prompt = f"""
-            Generate an escalation-appropriate response for this customer support scenario.
-            
-            Escalation level: {escalation_level}
-            Customer message: "{customer_message}"
-            
-            {escalation_prompts.get(escalation_level, "Provide a professional and helpful response.")}
-            
-            The response should:
-            1. Acknowledge their frustration appropriately
-            2. Take responsibility where applicable
-            3. Offer concrete next steps
-            4. Show genuine care for their experience
-            
-            Generate a response:
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.6,
-                max_tokens=config.MAX_RESPONSE_LENGTH
+            prompt = ESCALATION_PROMPT.format(
+                escalation_level=escalation_level,
+                customer_message=customer_message,
+                guidance=ESCALATION_GUIDANCE.get(escalation_level, "Provide a professional and helpful response.")
             )
             
-            return response.choices[0].message.content.strip()
+            return self._cached_completion("escalation", [{"role": "user", "content": prompt}], 0.6)
             
         except Exception as e:
             st.error(f"Escalation response generation failed: {str(e)}")
@@ -264,11 +332,5 @@ class ResponseGenerator:
     
     def is_healthy(self) -> bool:
         """Check if response generator is working properly"""
-        try:
-            # Test with simple generation
-            test_response = self._generate_ai_response(
-                "Hello", "Test context", [], "professional", {"sentiment_score": 0.5}
-            )
-            return len(test_response) > 0
-        except:
-            return False
+        # A cached API reachability probe instead of a billed completion per check
+        return openai_reachable()
@@ -0,0 +1,152 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import config
+
+
+class SemanticCache:
+    """LRU cache of model results keyed on prompt text, with near-duplicate lookup.
+
+    Exact repeats are served from a SHA-256 keyed dict without any API call.
+    Otherwise the prompt is embedded and compared (cosine) against cached
+    prompts of the same namespace; a match at or above ``threshold`` reuses
+    the cached result. Embeddings live in a preallocated matrix so a lookup
+    is a single matrix-vector product. Without an ``embed_fn`` only exact
+    repeats hit. An optional ``shared_store`` (a vector store) is consulted
+    after a local miss and receives every new result, so entries survive
+    restarts and are shared between processes.
+    """
+
+    def __init__(self, embed_fn: Optional[Callable[[str], List[float]]], threshold: float = 0.92,
+                 max_entries: int = 1024, shared_store=None):
+        self.embed_fn = embed_fn
+        self.shared_store = shared_store
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> slot, oldest first
+        self._values: List[Any] = [None] * max_entries
+        self._slot_keys: List[Optional[str]] = [None] * max_entries
+        # Namespace of each slot as an integer code (-1 = exact-match only), so masking is one vector compare
+        self._namespace_ids = np.full(max_entries, -1, dtype=np.int32)
+        self._namespace_codes: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None  # (max_entries, dim), allocated on first embedding
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embed_fn is None:
+            return None
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception:
+            return None  # fuzzy matching is best-effort
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get_or_compute(self, namespace: str, text: str, compute: Callable[[], Dict]) -> Dict:
+        """Return a cached result for an identical or near-identical prompt, else compute and store it"""
+        key = self._key(namespace, text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._values[self._entries[key]]
+
+        embedding = self._embed(text)
+        if embedding is not None:
+            with self._lock:
+                slot = self._nearest(namespace, embedding)
+                if slot is not None:
+                    self._entries.move_to_end(self._slot_keys[slot])
+                    self.hits += 1
+                    return self._values[slot]
+            if self.shared_store is not None:
+                result = self.shared_store.semantic_cache_lookup(embedding, namespace, self.threshold)
+                if result is not None:
+                    with self._lock:
+                        self.hits += 1
+                        self._store(key, namespace, embedding, result)
+                    return result
+
+        result = compute()
+        with self._lock:
+            self.misses += 1
+            self._store(key, namespace, embedding, result)
+        if self.shared_store is not None and embedding is not None:
+            self.shared_store.semantic_cache_store(key, embedding, namespace, result)
+        return result
+
+    def get(self, namespace: str, text: str) -> Optional[Any]:
+        """Cached result for exactly this prompt, or None"""
+        key = self._key(namespace, text)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._values[self._entries[key]]
+
+    def put(self, namespace: str, text: str, value: Any):
+        """Store a result for exact lookups (e.g. after a streamed response completes)"""
+        with self._lock:
+            self._store(self._key(namespace, text), namespace, None, value)
+
+    def _nearest(self, namespace: str, embedding: np.ndarray) -> Optional[int]:
+        if self._matrix is None or not self._entries or self._matrix.shape[1] != len(embedding):
+            return None
+        code = self._namespace_codes.get(namespace)
+        if code is None:
+            return None
+        scores = self._matrix @ embedding
+        scores[self._namespace_ids != code] = -np.inf
+        best = int(np.argmax(scores))
+        return best if scores[best] >= self.threshold else None
+
+    def _store(self, key: str, namespace: str, embedding: Optional[np.ndarray], value: Any):
+        if key in self._entries:
+            slot = self._entries.pop(key)
+        elif len(self._entries) >= self.max_entries:
+            _, slot = self._entries.popitem(last=False)  # evict least recently used
+        else:
+            slot = len(self._entries)
+        self._entries[key] = slot
+        self._slot_keys[slot] = key
+        self._values[slot] = value
+        if embedding is not None and self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+        if self._matrix is not None:
+            if embedding is not None and len(embedding) == self._matrix.shape[1]:
+                self._matrix[slot] = embedding
+                self._namespace_ids[slot] = self._namespace_codes.setdefault(namespace, len(self._namespace_codes))
+            else:
+                self._namespace_ids[slot] = -1  # exact-match only
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._values = [None] * self.max_entries
+            self._slot_keys = [None] * self.max_entries
+            self._namespace_ids[:] = -1
+            self._matrix = None
+
+
+def create_semantic_cache(owner, shared_store=None) -> Optional[SemanticCache]:
+    """Semantic cache embedding with ``owner.openai_client`` (looked up per call), or None when disabled.
+
+    ``shared_store`` backs the cache with a vector store when SHARED_SEMANTIC_CACHE is on.
+    """
+    if config.SEMANTIC_CACHE_SIZE <= 0:
+        return None
+
+    def embed(text: str) -> List[float]:
+        return owner.openai_client.embeddings.create(model=config.EMBEDDING_MODEL, input=text).data[0].embedding
+
+    return SemanticCache(embed, threshold=config.SEMANTIC_CACHE_THRESHOLD, max_entries=config.SEMANTIC_CACHE_SIZE,
+                         shared_store=shared_store if config.SHARED_SEMANTIC_CACHE else None)
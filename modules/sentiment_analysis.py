@@ -1,15 +1,45 @@
 import openai
-from openai import OpenAI
-import json
+import re
 import streamlit as st
 import time
-from typing import Dict, Any
+from bisect import bisect_right
+from typing import Dict, Any, List
+import numpy as np
 import config
+from modules.semantic_cache import create_semantic_cache
+from utils.helpers import from_json, get_openai_client, openai_reachable, to_json, unit_score
+
+# Trigger keyword -> severity weight; the summed weight is the rule-based escalation likelihood
+ESCALATION_TRIGGERS = {
+    "manager": 0.4, "supervisor": 0.4, "complaint": 0.5, "unacceptable": 0.5,
+    "terrible": 0.3, "awful": 0.3, "worst": 0.3, "cancel": 0.3, "refund": 0.2,
+    "lawsuit": 1.0, "attorney": 1.0, "fraud": 0.9, "scam": 0.8, "useless": 0.3
+}
+ESCALATION_TRIGGERS_RE = re.compile("|".join(map(re.escape, ESCALATION_TRIGGERS)), re.IGNORECASE)
+# Likelihoods outside this band are settled by the weights; only ambiguous ones reach the model
+TRIGGER_LLM_BAND = (0.3, 0.8)
+TRIGGER_SEVERITY_BOUNDS = (0.3, 0.6, 0.8)
+TRIGGER_SEVERITIES = ("low", "medium", "high", "critical")
+
+# Messages analyzed per completion by analyze_sentiment_batch
+SENTIMENT_BATCH_SIZE = 8
+SENTIMENT_BATCH_INSTRUCTIONS = """You are an expert sentiment and emotion analysis AI.
+For every customer message in the JSON list "messages", provide:
+1. Sentiment score (0.0 = very negative, 1.0 = very positive)
+2. Confidence level (0.0 to 1.0)
+3. Primary emotion from: {emotions}
+4. Urgency level (0.0 = low, 1.0 = urgent)
+5. Key indicators that led to this analysis
+
+Respond with JSON holding one analysis per message, in the same order:
+{{"analyses": [{{"sentiment_score": number, "confidence": number, "primary_emotion": "emotion_name", "urgency": number, "indicators": ["indicator1", "indicator2"]}}]}}"""
 
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, vector_store=None):
         """Initialize sentiment analyzer with OpenAI client"""
-        self.openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
+        # The vector store doubles as a shared, persistent tier when SHARED_SEMANTIC_CACHE is on
+        self.semantic_cache = create_semantic_cache(self, shared_store=vector_store)
         
         # Sentiment mapping
         self.sentiment_labels = {
@@ -19,6 +49,10 @@ class SentimentAnalyzer:
             (0.6, 0.8): "positive",
             (0.8, 1.0): "very_positive"
         }
+        # Band lower bounds (after the first) for bisect lookups, with labels in band order
+        bands = sorted(self.sentiment_labels.items())
+        self._label_thresholds = [min_val for (min_val, _), _ in bands[1:]]
+        self._labels = [label for _, label in bands]
         
         # Emotion categories
         self.emotions = [
@@ -51,39 +85,29 @@ class SentimentAnalyzer:
             }}
             """
             
-            response = self.openai_client.chat.completions.create(
-                model=config.CHAT_MODEL,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert sentiment and emotion analysis AI. "
-                        "Provide accurate, nuanced analysis of customer communications."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            
-            # Validate and normalize results
-            sentiment_score = max(0.0, min(1.0, result.get("sentiment_score", 0.5)))
-            confidence = max(0.0, min(1.0, result.get("confidence", 0.5)))
-            urgency = max(0.0, min(1.0, result.get("urgency", 0.5)))
+            def request() -> Dict[str, Any]:
+                response = self.openai_client.chat.completions.create(
+                    model=config.CHAT_MODEL,  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are an expert sentiment and emotion analysis AI. "
+                            "Provide accurate, nuanced analysis of customer communications."
+                        },
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                )
+                return from_json(response.choices[0].message.content)
             
-            # Get sentiment label
-            sentiment_label = self._get_sentiment_label(sentiment_score)
+            # Near-duplicate messages ("thanks!" / "thank you") reuse an earlier analysis
+            if self.semantic_cache is None:
+                result = request()
+            else:
+                result = self.semantic_cache.get_or_compute("sentiment", text, request)
             
-            return {
-                "sentiment_score": sentiment_score,
-                "sentiment_label": sentiment_label,
-                "confidence": confidence,
-                "primary_emotion": result.get("primary_emotion", "neutral"),
-                "urgency": urgency,
-                "indicators": result.get("indicators", []),
-                "analysis_timestamp": time.time()
-            }
+            return self._normalize_analysis(result)
             
         except Exception as e:
             st.error(f"Sentiment analysis failed: {str(e)}")
@@ -98,12 +122,61 @@ class SentimentAnalyzer:
                 "analysis_timestamp": time.time()
             }
     
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Analyze many messages with one completion per SENTIMENT_BATCH_SIZE uncached messages, in input order"""
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for text in dict.fromkeys(texts):
+            cached = self.semantic_cache.get("sentiment", text) if self.semantic_cache is not None else None
+            if cached is not None:
+                results[text] = self._normalize_analysis(cached)
+            else:
+                pending.append(text)
+        
+        for i in range(0, len(pending), SENTIMENT_BATCH_SIZE):
+            chunk = pending[i:i + SENTIMENT_BATCH_SIZE]
+            try:
+                response = self.openai_client.chat.completions.create(
+                    model=config.CHAT_MODEL,
+                    messages=[
+                        {"role": "system", "content": SENTIMENT_BATCH_INSTRUCTIONS.format(emotions=', '.join(self.emotions))},
+                        {"role": "user", "content": to_json({"messages": chunk})}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                )
+                analyses = from_json(response.choices[0].message.content).get("analyses", [])
+            except Exception:
+                analyses = []  # the messages are analyzed one by one below
+            for text, result in zip(chunk, analyses):
+                if not isinstance(result, dict):
+                    continue  # malformed entry
+                results[text] = self._normalize_analysis(result)
+                if self.semantic_cache is not None:
+                    self.semantic_cache.put("sentiment", text, result)
+        
+        # Anything the batch reply left out goes through the single-message path
+        return [results[text] if text in results else self.analyze_sentiment(text) for text in texts]
+    
+    def _normalize_analysis(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a model analysis: scores clamped into [0, 1], wrong types replaced by defaults, label attached"""
+        sentiment_score = unit_score(result.get("sentiment_score"), 0.5)
+        emotion = result.get("primary_emotion")
+        indicators = result.get("indicators")
+        
+        return {
+            "sentiment_score": sentiment_score,
+            "sentiment_label": self._get_sentiment_label(sentiment_score),
+            "confidence": unit_score(result.get("confidence"), 0.5),
+            "primary_emotion": emotion if isinstance(emotion, str) else "neutral",
+            "urgency": unit_score(result.get("urgency"), 0.5),
+            "indicators": indicators if isinstance(indicators, list) else [],
+            "analysis_timestamp": time.time()
+        }
+    
     def _get_sentiment_label(self, score: float) -> str:
         """Get sentiment label based on score"""
-        for (min_val, max_val), label in self.sentiment_labels.items():
-            if min_val <= score < max_val:
-                return label
-        return "very_positive" if score >= 0.8 else "very_negative"
+        return self._labels[bisect_right(self._label_thresholds, score)]
     
     def analyze_conversation_trend(self, conversation_history: list) -> Dict[str, Any]:
         """Analyze sentiment trend across conversation"""
@@ -116,15 +189,15 @@ class SentimentAnalyzer:
             if len(customer_messages) < 2:
                 return {"trend": "insufficient_data"}
             
-            scores = [msg['sentiment_score'] for msg in customer_messages]
+            scores = np.fromiter((msg['sentiment_score'] for msg in customer_messages), dtype=np.float64)
             
             # Calculate trend
             if len(scores) >= 3:
-                recent_avg = sum(scores[-3:]) / 3
-                earlier_avg = sum(scores[:-3]) / len(scores[:-3]) if len(scores) > 3 else scores[0]
-                trend_direction = recent_avg - earlier_avg
+                recent_avg = scores[-3:].mean()
+                earlier_avg = scores[:-3].mean() if len(scores) > 3 else scores[0]
+                trend_direction = float(recent_avg - earlier_avg)
             else:
-                trend_direction = scores[-1] - scores[0]
+                trend_direction = float(scores[-1] - scores[0])
             
             # Determine trend category
             if trend_direction > 0.1:
@@ -137,9 +210,9 @@ class SentimentAnalyzer:
             return {
                 "trend": trend,
                 "trend_strength": abs(trend_direction),
-                "current_score": scores[-1],
-                "average_score": sum(scores) / len(scores),
-                "score_range": max(scores) - min(scores),
+                "current_score": customer_messages[-1]['sentiment_score'],
+                "average_score": float(scores.mean()),
+                "score_range": float(np.ptp(scores)),
                 "message_count": len(customer_messages)
             }
             
@@ -150,18 +223,23 @@ class SentimentAnalyzer:
     def detect_escalation_triggers(self, text: str) -> Dict[str, Any]:
         """Detect specific escalation triggers in customer message"""
         try:
-            escalation_keywords = [
-                "manager", "supervisor", "complaint", "unacceptable", 
-                "terrible", "awful", "worst", "cancel", "refund",
-                "lawsuit", "attorney", "fraud", "scam", "useless"
-            ]
+            # Check for escalation keywords in a single regex pass, reported in list order
+            matched = {match.lower() for match in ESCALATION_TRIGGERS_RE.findall(text)}
+            triggers_found = [keyword for keyword in ESCALATION_TRIGGERS if keyword in matched]
             
-            # Check for escalation keywords
-            text_lower = text.lower()
-            triggers_found = [keyword for keyword in escalation_keywords if keyword in text_lower]
-            
-            # Analyze escalation intent with AI
             if triggers_found:
+                likelihood = min(1.0, sum(ESCALATION_TRIGGERS[keyword] for keyword in triggers_found))
+                low, high = TRIGGER_LLM_BAND
+                if likelihood < low or likelihood > high:
+                    return {
+                        "triggers_found": triggers_found,
+                        "escalation_likelihood": likelihood,
+                        "severity": TRIGGER_SEVERITIES[bisect_right(TRIGGER_SEVERITY_BOUNDS, likelihood)],
+                        "reasoning": "Scored from keyword severity weights",
+                        "keyword_count": len(triggers_found)
+                    }
+                
+                # Analyze ambiguous escalation intent with AI
                 prompt = f"""
                 Analyze this customer message for escalation intent and severity.
                 Message: "{text}"
@@ -177,18 +255,23 @@ class SentimentAnalyzer:
                 }}
                 """
                 
-                response = self.openai_client.chat.completions.create(
-                    model=config.CHAT_MODEL,
-                    messages=[{"role": "user", "content": prompt}],
-                    response_format={"type": "json_object"},
-                    temperature=0.2
-                )
+                def request() -> Dict[str, Any]:
+                    response = self.openai_client.chat.completions.create(
+                        model=config.CHAT_MODEL,
+                        messages=[{"role": "user", "content": prompt}],
+                        response_format={"type": "json_object"},
+                        temperature=0.2
+                    )
+                    return from_json(response.choices[0].message.content)
                 
-                ai_result = json.loads(response.choices[0].message.content)
+                if self.semantic_cache is None:
+                    ai_result = request()
+                else:
+                    ai_result = self.semantic_cache.get_or_compute("escalation_triggers", text, request)
                 
                 return {
                     "triggers_found": triggers_found,
-                    "escalation_likelihood": ai_result.get("escalation_likelihood", 0.5),
+                    "escalation_likelihood": unit_score(ai_result.get("escalation_likelihood"), 0.5),
                     "severity": ai_result.get("severity", "medium"),
                     "reasoning": ai_result.get("reasoning", ""),
                     "keyword_count": len(triggers_found)
@@ -214,9 +297,5 @@ class SentimentAnalyzer:
     
     def is_healthy(self) -> bool:
         """Check if sentiment analyzer is working properly"""
-        try:
-            # Test with simple message
-            test_result = self.analyze_sentiment("Hello, I need help with my account.")
-            return "sentiment_score" in test_result
-        except:
-            return False
+        # A cached API reachability probe instead of a billed completion per check
+        return openai_reachable()
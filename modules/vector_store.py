@@ -1,17 +1,52 @@
 from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
 import streamlit as st
-import json
+import os
 import time
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import List, Dict, Any, Optional
 import config
+from modules.embedding_cache import EmbeddingCache
+from utils.helpers import from_json, get_openai_client, to_json, to_json_bytes
+
+try:
+    import faiss  # type: ignore
+except ImportError:  # optional local retrieval backend
+    faiss = None
+
+# Documents embedded (one OpenAI request) and upserted per Pinecone batch
+UPSERT_BATCH_SIZE = 64
+UPSERT_WORKERS = 4
+# Texts per embeddings request (the API caps a request at 2048 inputs and 300k tokens)
+EMBEDDING_REQUEST_SIZE = 256
+# Pending Batch API embedding jobs (documents awaiting vectors, keyed by batch id)
+EMBEDDING_BATCH_DIR = "data/embedding_batches"
+# Seconds a Pinecone health check result is reused before the index is asked again
+HEALTH_CHECK_TTL = 60.0
+# Pinecone namespace prefix for shared semantic-cache entries (kept apart from the knowledge base)
+SEMANTIC_CACHE_NAMESPACE = "semantic-cache"
+# Local FAISS index: single edits are applied in place (appended rows, tombstoned old rows);
+# the index is retrained and compacted once dead plus newly added rows exceed this fraction
+# of the rows it was last built with
+FAISS_REBUILD_FRACTION = 0.2
+
+def _knowledge_base_count(stats) -> int:
+    """Vectors in the default (knowledge base) namespace; total_vector_count also counts cache entries"""
+    namespaces = getattr(stats, "namespaces", None) or {}
+    for name in ("", "__default__"):
+        if name in namespaces:
+            return namespaces[name].vector_count
+    return 0
 
 class VectorStore:
     def __init__(self):
         """Initialize Pinecone vector store and OpenAI client"""
-        self.openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.openai_client = get_openai_client()
+        self.embedding_cache = EmbeddingCache(config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_SIZE)
         self.pc = Pinecone(api_key=config.PINECONE_API_KEY)
         self.index = None
+        self._healthy = False
+        self._health_checked_at = 0.0
         # Allow faster cold start by deferring heavy index work
         if not getattr(config, 'FAST_INIT', False):
             self._initialize_index()
@@ -46,7 +81,7 @@ class VectorStore:
             # Initialize with sample knowledge base if empty
             try:
                 stats = self.index.describe_index_stats()
-                if stats.total_vector_count == 0:
+                if _knowledge_base_count(stats) == 0:
                     st.info("Loading initial knowledge base...")
                     self._load_initial_knowledge_base()
             except Exception as stats_error:
@@ -62,22 +97,38 @@ class VectorStore:
         """Load initial knowledge base into vector store"""
         try:
             from modules.knowledge_processor import KnowledgeProcessor
-            processor = KnowledgeProcessor()
+            processor = KnowledgeProcessor(vector_store=self)
             processor.load_knowledge_base()
         except Exception as e:
             st.warning(f"Failed to load initial knowledge base: {str(e)}")
     
     def get_embedding(self, text: str) -> List[float]:
-        """Generate embedding for given text using OpenAI"""
+        """Generate embedding for given text using OpenAI (cached)"""
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings for several texts; only texts missing from the cache go to OpenAI, in as few requests as possible"""
+        if not texts:
+            return []
+        embeddings = self.embedding_cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if not missing:
+            return embeddings
         try:
-            response = self.openai_client.embeddings.create(
-                model=config.EMBEDDING_MODEL,
-                input=text
-            )
-            return response.data[0].embedding
+            fresh = []
+            for i in range(0, len(missing), EMBEDDING_REQUEST_SIZE):
+                response = self.openai_client.embeddings.create(
+                    model=config.EMBEDDING_MODEL,
+                    input=missing[i:i + EMBEDDING_REQUEST_SIZE]
+                )
+                # The API may return items out of order; realign by index
+                fresh.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
         except Exception as e:
-            st.error(f"Failed to generate embedding: {str(e)}")
+            st.error(f"Failed to generate embeddings: {str(e)}")
             raise e
+        self.embedding_cache.put_many(missing, fresh)
+        by_text = dict(zip(missing, fresh))
+        return [embedding if embedding is not None else by_text[text] for text, embedding in zip(texts, embeddings)]
     
     def upsert_documents(self, documents: List[Dict[str, Any]]):
         """Upsert documents into vector store"""
@@ -86,29 +137,14 @@ class VectorStore:
                 st.warning("Vector store not initialized. Cannot store documents.")
                 return False
                 
-            vectors = []
-            for doc in documents:
-                # Generate embedding for document content
-                embedding = self.get_embedding(doc['content'])
-                
-                vector = {
-                    'id': doc['id'],
-                    'values': embedding,
-                    'metadata': {
-                        'title': doc.get('title', ''),
-                        'content': doc['content'],
-                        'category': doc.get('category', 'general'),
-                        'tags': doc.get('tags', []),
-                        'created_at': doc.get('created_at', time.time())
-                    }
-                }
-                vectors.append(vector)
-            
-            # Upsert in batches
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
+            # Embed and upsert fixed-size batches concurrently, so only a few
+            # batches of vectors are in memory and network stages overlap
+            batches = [documents[i:i + UPSERT_BATCH_SIZE] for i in range(0, len(documents), UPSERT_BATCH_SIZE)]
+            if len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=min(UPSERT_WORKERS, len(batches))) as executor:
+                    list(executor.map(self._upsert_batch, batches))
+            elif batches:
+                self._upsert_batch(batches[0])
             
             return True
             
@@ -116,6 +152,96 @@ class VectorStore:
             st.error(f"Failed to upsert documents: {str(e)}")
             return False
     
+    def submit_embedding_batch(self, documents: List[Dict[str, Any]]) -> Optional[str]:
+        """Embed documents through an OpenAI Batch job (half price, completes within 24h) for offline indexing.
+
+        Only contents missing from the embedding cache are submitted; returns
+        None when there is nothing to embed. ``poll_embedding_batch`` upserts
+        the documents once the vectors are in.
+        """
+        contents = [doc['content'] for doc in documents]
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(contents, self.embedding_cache.get_many(contents)) if embedding is None
+        ))
+        if not missing:
+            return None
+        
+        lines = [
+            to_json({
+                "custom_id": f"embed-{i}",
+                "method": "POST",
+                "url": "/v1/embeddings",
+                "body": {"model": config.EMBEDDING_MODEL, "input": missing[i:i + EMBEDDING_REQUEST_SIZE]}
+            })
+            for i in range(0, len(missing), EMBEDDING_REQUEST_SIZE)
+        ]
+        batch_input = self.openai_client.files.create(
+            file=("embeddings.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.openai_client.batches.create(
+            input_file_id=batch_input.id,
+            endpoint="/v1/embeddings",
+            completion_window="24h"
+        )
+        
+        os.makedirs(EMBEDDING_BATCH_DIR, exist_ok=True)
+        with open(os.path.join(EMBEDDING_BATCH_DIR, f"{batch.id}.json"), 'wb') as f:
+            f.write(to_json_bytes({"texts": missing, "documents": documents}))
+        return batch.id
+    
+    def poll_embedding_batch(self, batch_id: str) -> Optional[bool]:
+        """Upsert the documents of a finished embedding batch; None while it is still running"""
+        try:
+            batch = self.openai_client.batches.retrieve(batch_id)
+            if batch.status in ("failed", "expired", "cancelled"):
+                st.error(f"Embedding batch {batch_id} {batch.status}")
+                return False
+            if batch.status != "completed":
+                return None
+            
+            with open(os.path.join(EMBEDDING_BATCH_DIR, f"{batch_id}.json"), 'rb') as f:
+                pending = from_json(f.read())
+            texts = pending["texts"]
+            
+            if batch.output_file_id:
+                for line in self.openai_client.files.content(batch.output_file_id).text.splitlines():
+                    if not line.strip():
+                        continue
+                    item = from_json(line)
+                    start = int(item["custom_id"].rsplit("-", 1)[1])
+                    body = (item.get("response") or {}).get("body") or {}
+                    data = sorted(body.get("data", []), key=lambda d: d["index"])
+                    chunk = texts[start:start + EMBEDDING_REQUEST_SIZE]
+                    if len(data) == len(chunk):
+                        self.embedding_cache.put_many(chunk, [d["embedding"] for d in data])
+            
+            # Vectors now come from the cache; any failed request is embedded synchronously
+            return self.upsert_documents(pending["documents"])
+            
+        except Exception as e:
+            st.error(f"Failed to collect embedding batch: {str(e)}")
+            return False
+    
+    def _upsert_batch(self, documents: List[Dict[str, Any]]):
+        """Embed one batch of documents in a single request and upsert it"""
+        embeddings = self.get_embeddings([doc['content'] for doc in documents])
+        vectors = [
+            {
+                'id': doc['id'],
+                'values': embedding,
+                'metadata': {
+                    'title': doc.get('title', ''),
+                    'content': doc['content'],
+                    'category': doc.get('category', 'general'),
+                    'tags': doc.get('tags', []),
+                    'created_at': doc.get('created_at', time.time())
+                }
+            }
+            for doc, embedding in zip(documents, embeddings)
+        ]
+        self.index.upsert(vectors=vectors)
+    
     def similarity_search(self, query: str, k: int = 5, filter_dict: Dict = None) -> List[Dict]:
         """Perform similarity search and return relevant documents"""
         try:
@@ -129,9 +255,24 @@ class VectorStore:
             # Generate query embedding
             query_embedding = self.get_embedding(query)
             
+            return self.query_by_vector(query_embedding, k=k, filter_dict=filter_dict)
+            
+        except Exception as e:
+            st.error(f"Failed to perform similarity search: {str(e)}")
+            return self._fallback_search(query)
+    
+    def query_by_vector(self, embedding: List[float], k: int = 5, filter_dict: Dict = None) -> List[Dict]:
+        """Search with a precomputed query embedding"""
+        try:
+            if self.index is None:
+                # Attempt lazy init now, as similarity_search does
+                self._initialize_index()
+                if self.index is None:
+                    return self._fallback_search("")
+            
             # Search similar vectors
             search_results = self.index.query(
-                vector=query_embedding,
+                vector=embedding,
                 top_k=k,
                 include_metadata=True,
                 filter=filter_dict
@@ -154,7 +295,41 @@ class VectorStore:
             
         except Exception as e:
             st.error(f"Failed to perform similarity search: {str(e)}")
-            return self._fallback_search(query)
+            return self._fallback_search("")
+    
+    def semantic_cache_lookup(self, embedding: np.ndarray, namespace: str, threshold: float) -> Optional[Any]:
+        """Cached model result for the closest stored prompt at or above ``threshold``, or None"""
+        if self.index is None or self.pc is None:
+            return None
+        try:
+            results = self.index.query(
+                vector=embedding.tolist(),
+                top_k=1,
+                namespace=f"{SEMANTIC_CACHE_NAMESPACE}-{namespace}",
+                include_metadata=True
+            )
+            matches = results.matches
+            if matches and matches[0].score >= threshold:
+                return from_json(matches[0].metadata['result_json'])
+        except Exception:
+            pass  # the shared tier is best-effort; the caller computes on a miss
+        return None
+    
+    def semantic_cache_store(self, key: str, embedding: np.ndarray, namespace: str, result: Any):
+        """Share a model result under its prompt key so other processes and restarts can reuse it"""
+        if self.index is None or self.pc is None:
+            return
+        try:
+            self.index.upsert(
+                vectors=[{
+                    'id': key,
+                    'values': embedding.tolist(),
+                    'metadata': {'result_json': to_json(result), 'created_at': time.time()}
+                }],
+                namespace=f"{SEMANTIC_CACHE_NAMESPACE}-{namespace}"
+            )
+        except Exception:
+            pass
     
     def delete_document(self, doc_id: str) -> bool:
         """Delete document from vector store"""
@@ -170,7 +345,7 @@ class VectorStore:
         try:
             stats = self.index.describe_index_stats()
             return {
-                'total_vectors': stats.total_vector_count,
+                'total_vectors': _knowledge_base_count(stats),
                 'dimension': stats.dimension,
                 'index_fullness': stats.index_fullness
             }
@@ -202,11 +377,311 @@ class VectorStore:
         return fallback_docs[:2]
 
     def is_healthy(self) -> bool:
-        """Check if vector store is healthy and accessible"""
+        """Check if vector store is healthy and accessible (re-checked at most every HEALTH_CHECK_TTL seconds)"""
+        if self.index is None:
+            return False
+        now = time.time()
+        if now - self._health_checked_at < HEALTH_CHECK_TTL:
+            return self._healthy
+        try:
+            self.index.describe_index_stats()
+            self._healthy = True
+        except:
+            self._healthy = False
+        self._health_checked_at = now
+        return self._healthy
+
+
+
+@st.cache_resource(show_spinner=False)
+def load_faiss_index(path: str):
+    """Load a persisted FAISS index with its ids, metadata and raw vectors once per process.
+
+    Returns None when nothing has been persisted at ``path`` yet; the index
+    slot is None when only the raw vectors exist. Ids of deleted or replaced
+    rows are None until the next rebuild.
+    """
+    vectors_path = os.path.join(path, "vectors.npy")
+    docs_path = os.path.join(path, "docs.json")
+    if not (os.path.exists(vectors_path) and os.path.exists(docs_path)):
+        return None
+    with open(docs_path, 'rb') as f:
+        docs = from_json(f.read())
+    # Memory-mapped: raw vectors are only touched when re-ranking candidates
+    vectors = np.load(vectors_path, mmap_mode='r')
+    index_path = os.path.join(path, "index.faiss")
+    index = faiss.read_index(index_path) if os.path.exists(index_path) else None
+    return index, docs["ids"], docs["metadata"], vectors, docs.get("built_rows", len(docs["ids"]))
+
+
+class LocalFaissStore(VectorStore):
+    """In-process FAISS index with the same interface as the Pinecone-backed store"""
+
+    def __init__(self):
+        """Initialize OpenAI client and load the persisted FAISS index"""
+        self.openai_client = get_openai_client()
+        self.embedding_cache = EmbeddingCache(config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_SIZE)
+        self.pc = None
+        self.index = None
+        self.path = config.FAISS_INDEX_PATH
+        self._ids: List[Optional[str]] = []  # row -> document id, None for dead rows
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._vectors = np.empty((0, config.EMBEDDING_DIMENSION), dtype=np.float32)
+        self._built_rows = 0  # rows in the index when it was last trained
+        self._categories: Optional[set] = None  # indexed categories, recomputed after changes
+        self._initialize_index()
+
+    def _initialize_index(self):
+        """Load index, vectors and metadata from disk, seeding the KB if empty"""
+        try:
+            persisted = load_faiss_index(self.path)
+            if persisted is not None:
+                index, ids, metadata, vectors, built_rows = persisted
+                # Copy the containers so in-place edits never leak into the shared cache entry
+                self._ids = list(ids)
+                self._metadata = dict(metadata)
+                self._vectors = vectors
+                self._built_rows = built_rows
+                self._categories = None
+                if index is not None:
+                    self.index = index
+                    self._configure_search(self.index)
+                else:
+                    self._rebuild_index()
+            else:
+                self.index = faiss.IndexFlatIP(config.EMBEDDING_DIMENSION)
+                st.info("Loading initial knowledge base...")
+                self._load_initial_knowledge_base()
+        except Exception as e:
+            st.error(f"Failed to initialize FAISS index: {str(e)}")
+            self.index = None
+
+    def _build_index(self, vectors: np.ndarray):
+        """Build the configured index, falling back to exact search when there is too little data to train"""
+        dim = vectors.shape[1]
+        index = faiss.index_factory(dim, config.FAISS_INDEX_FACTORY, faiss.METRIC_INNER_PRODUCT)
+        if not index.is_trained:
+            if len(vectors) > config.FAISS_TRAIN_SAMPLE:
+                sample = np.random.default_rng(0).choice(len(vectors), config.FAISS_TRAIN_SAMPLE, replace=False)
+                training = vectors[np.sort(sample)]
+            else:
+                training = vectors
+            try:
+                index.train(np.ascontiguousarray(training))
+            except RuntimeError:
+                index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+        self._configure_search(index)
+        return index
+
+    def _configure_search(self, index):
+        """Apply query-time search parameters"""
+        hnsw = getattr(faiss.downcast_index(index), 'hnsw', None)
+        if hnsw is not None:
+            hnsw.efSearch = config.FAISS_HNSW_EF_SEARCH
+        try:
+            faiss.extract_index_ivf(index).nprobe = config.FAISS_NPROBE
+        except RuntimeError:
+            pass  # not an IVF index
+
+    def _rebuild_index(self):
+        """Drop dead rows and rebuild the index from the raw vectors; row i corresponds to self._ids[i]"""
+        self._categories = None
+        live = [i for i, doc_id in enumerate(self._ids) if doc_id is not None]
+        if len(live) < len(self._ids):
+            self._vectors = np.asarray(self._vectors)[live]
+            self._ids = [self._ids[i] for i in live]
+        if len(self._ids) == 0:
+            self.index = faiss.IndexFlatIP(config.EMBEDDING_DIMENSION)
+        else:
+            self.index = self._build_index(self._vectors)
+        self._built_rows = len(self._ids)
+
+    def _apply_changes(self, new_vectors: Optional[np.ndarray] = None):
+        """Add freshly appended rows to the trained index, or rebuild once too much has changed"""
+        self._categories = None
+        dead = len(self._ids) - len(self._metadata)
+        added = len(self._ids) - self._built_rows
+        if dead + added > FAISS_REBUILD_FRACTION * self._built_rows:
+            self._rebuild_index()  # also covers bulk loads into a new or small index
+        elif new_vectors is not None and len(new_vectors):
+            self.index.add(new_vectors)
+
+    def _persist(self):
+        """Write index, raw vectors and metadata to disk"""
+        os.makedirs(self.path, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(self.path, "index.faiss"))
+        np.save(os.path.join(self.path, "vectors.npy"), self._vectors)
+        with open(os.path.join(self.path, "docs.json"), 'wb') as f:
+            f.write(to_json_bytes({"ids": self._ids, "metadata": self._metadata, "built_rows": self._built_rows}))
+        load_faiss_index.clear()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows so inner product equals cosine similarity"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def upsert_documents(self, documents: List[Dict[str, Any]]):
+        """Embed documents and insert or replace them in the local index"""
         try:
             if self.index is None:
+                st.warning("Vector store not initialized. Cannot store documents.")
                 return False
-            stats = self.index.describe_index_stats()
+            if not documents:
+                return True
+
+            embeddings = self.get_embeddings([doc['content'] for doc in documents])
+            new_vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+
+            # Every document gets a new row; a replaced document's old row becomes dead
+            positions = {doc_id: i for i, doc_id in enumerate(self._ids) if doc_id is not None}
+            appended: Dict[str, np.ndarray] = {}
+            for doc, vector in zip(documents, new_vectors):
+                self._metadata[doc['id']] = {
+                    'title': doc.get('title', ''),
+                    'content': doc['content'],
+                    'category': doc.get('category', 'general'),
+                    'tags': doc.get('tags', []),
+                    'created_at': doc.get('created_at', time.time())
+                }
+                if doc['id'] in positions:
+                    self._ids[positions.pop(doc['id'])] = None
+                appended[doc['id']] = vector
+
+            added = np.stack(list(appended.values()))
+            self._ids.extend(appended)
+            self._vectors = np.vstack([self._vectors, added])
+
+            self._apply_changes(added)
+            self._persist()
             return True
-        except:
+
+        except Exception as e:
+            st.error(f"Failed to upsert documents: {str(e)}")
             return False
+
+    def similarity_search(self, query: str, k: int = 5, filter_dict: Dict = None) -> List[Dict]:
+        """Perform similarity search against the local index"""
+        try:
+            if self.index is None or self.index.ntotal == 0:
+                st.warning("Vector store unavailable; using fallback search.")
+                return self._fallback_search(query)
+            if filter_dict and not self._category_filter_may_match(filter_dict):
+                return []  # no indexed document can pass the filter, so skip the query embedding
+            query_embedding = self.get_embedding(query)
+            return self.query_by_vector(query_embedding, k=k, filter_dict=filter_dict)
+        except Exception as e:
+            st.error(f"Failed to perform similarity search: {str(e)}")
+            return self._fallback_search(query)
+
+    def query_by_vector(self, embedding: List[float], k: int = 5, filter_dict: Dict = None) -> List[Dict]:
+        """Search with a precomputed query embedding"""
+        try:
+            if self.index is None or self.index.ntotal == 0:
+                return self._fallback_search("")
+
+            query = self._normalize(np.asarray([embedding], dtype=np.float32))
+            # Over-fetch when filtering since FAISS has no metadata filters, and past any dead rows
+            fetch_k = (k * 4 if filter_dict else k) + len(self._ids) - len(self._metadata)
+            exact = isinstance(faiss.downcast_index(self.index), faiss.IndexFlat)
+            if not exact:
+                fetch_k = max(fetch_k, config.FAISS_RERANK_K)
+            scores, positions = self.index.search(query, min(self.index.ntotal, fetch_k))
+            scores, positions = scores[0], positions[0]
+
+            if not exact:
+                # Compressed codes give approximate scores; re-rank candidates with exact cosine
+                positions = positions[positions >= 0]
+                scores = self._vectors[positions] @ query[0]
+                order = np.argsort(-scores)
+                scores, positions = scores[order], positions[order]
+
+            results = []
+            for score, pos in zip(scores, positions):
+                if pos < 0:
+                    continue
+                doc_id = self._ids[pos]
+                if doc_id is None:
+                    continue  # deleted or replaced since the last rebuild
+                metadata = self._metadata[doc_id]
+                if filter_dict and not self._matches_filter(metadata, filter_dict):
+                    continue
+                results.append({
+                    'id': doc_id,
+                    'score': float(score),
+                    'title': metadata.get('title', ''),
+                    'content': metadata.get('content', ''),
+                    'category': metadata.get('category', 'general'),
+                    'tags': metadata.get('tags', [])
+                })
+                if len(results) == k:
+                    break
+
+            return results
+
+        except Exception as e:
+            st.error(f"Failed to perform similarity search: {str(e)}")
+            return self._fallback_search("")
+
+    def _category_filter_may_match(self, filter_dict: Dict) -> bool:
+        """False when the filter's category condition excludes every indexed category"""
+        if 'category' not in filter_dict:
+            return True
+        if self._categories is None:
+            self._categories = {metadata.get('category', 'general') for metadata in self._metadata.values()}
+        condition = {'category': filter_dict['category']}
+        return any(self._matches_filter({'category': category}, condition) for category in self._categories)
+
+    @staticmethod
+    def _matches_filter(metadata: Dict, filter_dict: Dict) -> bool:
+        """Evaluate the equality / $eq / $in subset of Pinecone metadata filters"""
+        for field, condition in filter_dict.items():
+            value = metadata.get(field)
+            if isinstance(condition, dict):
+                if "$eq" in condition and value != condition["$eq"]:
+                    return False
+                if "$in" in condition and value not in condition["$in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def delete_document(self, doc_id: str) -> bool:
+        """Delete document from the local index"""
+        try:
+            if doc_id not in self._metadata:
+                return True
+            self._ids[self._ids.index(doc_id)] = None
+            del self._metadata[doc_id]
+            self._apply_changes()
+            self._persist()
+            return True
+        except Exception as e:
+            st.error(f"Failed to delete document: {str(e)}")
+            return False
+
+    def get_index_stats(self) -> Dict:
+        """Get vector store statistics"""
+        try:
+            return {
+                'total_vectors': len(self._metadata),
+                'dimension': self.index.d,
+                'index_fullness': 0.0
+            }
+        except Exception as e:
+            st.error(f"Failed to get index stats: {str(e)}")
+            return {}
+
+    def is_healthy(self) -> bool:
+        """Check if the local index is loaded"""
+        return self.index is not None
+
+
+def create_vector_store() -> VectorStore:
+    """Build the vector store selected by config.RETRIEVAL_BACKEND"""
+    if config.RETRIEVAL_BACKEND == "faiss":
+        if faiss is not None:
+            return LocalFaissStore()
+        st.warning("RETRIEVAL_BACKEND=faiss but faiss is not installed; using Pinecone.")
+    return VectorStore()
@@ -0,0 +1,16 @@
+import config
+from modules.embedding_cache import EmbeddingCache
+
+
+def test_memory_and_disk_hits(tmp_path, monkeypatch):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(path, max_entries=1)
+    assert cache.get_many(["a", "b"]) == [None, None]
+
+    cache.put_many(["a", "b"], [[1.0, 0.0], [0.5, 0.25]])
+    assert cache.get_many(["b", "a", "b"]) == [[0.5, 0.25], [1.0, 0.0], [0.5, 0.25]]  # "a" comes back from disk
+
+    # A new process (fresh instance) reads the file; another model never shares vectors
+    assert EmbeddingCache(path).get_many(["a"]) == [[1.0, 0.0]]
+    monkeypatch.setattr(config, "EMBEDDING_MODEL", "other-model")
+    assert EmbeddingCache(path).get_many(["a"]) == [None]
@@ -0,0 +1,64 @@
+import types
+
+from modules.escalation_predictor import ConversationFeatureTracker, EscalationPredictor
+
+
+def test_incremental_features_match_full_scan(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    predictor = EscalationPredictor()
+    tracker = ConversationFeatureTracker()
+    history = []
+    contents = [
+        "My payment failed again",
+        "Payment failed twice now, refund please",
+        "Still failed, payment problem persists",
+        "This payment issue is unacceptable",
+    ]
+    for i, content in enumerate(contents):
+        for msg in (
+            {"sender": "customer", "content": content, "timestamp": 100.0 + i * 10, "sentiment_score": 0.6 - i * 0.1},
+            {"sender": "agent", "content": "Let me check that for you.", "timestamp": 105.0 + i * 10},
+        ):
+            history.append(msg)
+            tracker.update(msg)
+            expected = predictor._extract_conversation_features(history)  # type: ignore (private ok for test)
+            actual = tracker.features()
+            assert actual.keys() == expected.keys()
+            for key, value in expected.items():
+                assert actual[key] == value or abs(actual[key] - value) < 1e-9, key
+    assert tracker.features()["repeated_issues"] is True
+
+
+def test_clear_cut_risk_skips_model(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    predictor = EscalationPredictor()
+    calls = []
+    monkeypatch.setattr(predictor, "_ai_predict_escalation", lambda *args: calls.append(args) or 0.5)
+
+    assert predictor.predict_escalation("Thanks, that helped.", []) == 0.0
+    assert calls == []
+
+    predictor.predict_escalation("This is unacceptable, I am frustrated", [], {"current_sentiment": 0.2})
+    assert len(calls) == 1
+    assert len(predictor.score_pairs) == 1
+
+
+def test_model_prediction_cache_tracks_features(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    predictor = EscalationPredictor()
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = types.SimpleNamespace(content='{"escalation_risk": 0.2}')
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    predictor.openai_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    features = {"current_sentiment": 0.6, "conversation_duration": 125.0}
+
+    assert predictor._ai_predict_escalation("Where is my order?", features, []) == 0.2  # type: ignore (private ok for test)
+    predictor._ai_predict_escalation("Where is my order?", {**features, "conversation_duration": 150.0}, [])  # type: ignore
+    assert len(calls) == 1  # same minute, same features
+
+    predictor._ai_predict_escalation("Where is my order?", {**features, "current_sentiment": 0.15}, [])  # type: ignore
+    assert len(calls) == 2
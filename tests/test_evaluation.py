@@ -0,0 +1,135 @@
+import json
+import types
+
+import pytest
+
+import config
+from modules.evaluation import RAGEvaluator
+
+
+@pytest.fixture(autouse=True)
+def _eval_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EVAL_LOG_PATH", str(tmp_path / "evaluations.jsonl"))
+
+
+class _FakeCompletions:
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = types.SimpleNamespace(content=json.dumps(self.payload))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def test_evaluate_response_uses_one_call(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    evaluator = RAGEvaluator()
+    completions = _FakeCompletions({
+        "context_precision": 0.8,
+        "context_recall": 0.1,
+        "faithfulness": 1.4,
+        "answer_relevancy": 0.6,
+        "document_relevance": [1.0, 0.0],
+    })
+    evaluator.openai_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    docs = [
+        {"id": "a", "title": "Reset", "content": "Reset your password", "score": 0.8},
+        {"id": "b", "title": "Billing", "content": "Billing cycles", "score": 0.4},
+    ]
+
+    metrics = evaluator.evaluate_response("How do I reset my password?", "Use the reset link.", docs)["metrics"]
+
+    assert completions.calls == 1
+    assert metrics["context_precision"] == 0.8
+    assert metrics["faithfulness"] == 1.0  # clamped
+    assert abs(metrics["context_recall"] - 0.72) < 1e-9  # vector-score heuristic without ground truth
+    assert abs(metrics["retrieval_accuracy"] - (0.9 * 1 + 0.2 * 0.5) / 1.5) < 1e-9
+
+
+def test_malformed_fields_fall_back(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    evaluator = RAGEvaluator()
+    completions = _FakeCompletions({
+        "context_precision": None,
+        "faithfulness": "high",
+        "answer_relevancy": {"score": 1},
+        "document_relevance": [None, 0.0],
+    })
+    evaluator.openai_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    docs = [{"id": "a", "content": "c", "score": 0.8}, {"id": "b", "content": "d", "score": 0.4}]
+
+    result = evaluator.evaluate_response("q", "r", docs)
+
+    assert "error" not in result
+    assert result["metrics"]["context_precision"] == result["metrics"]["faithfulness"] == 0.5
+    assert abs(result["metrics"]["retrieval_accuracy"] - (0.65 * 1 + 0.2 * 0.5) / 1.5) < 1e-9
+
+
+class _FakeBatchClient:
+    def __init__(self, payload):
+        self.payload = payload
+        self.uploaded = None
+        self.status = "in_progress"
+        self.files = types.SimpleNamespace(create=self._upload, content=self._download)
+        self.batches = types.SimpleNamespace(create=self._create, retrieve=self._retrieve)
+
+    def _upload(self, file, purpose):
+        self.uploaded = file[1].decode("utf-8").splitlines()
+        return types.SimpleNamespace(id="file-in")
+
+    def _create(self, **kwargs):
+        return types.SimpleNamespace(id="batch-1")
+
+    def _retrieve(self, batch_id):
+        return types.SimpleNamespace(status=self.status, output_file_id="file-out")
+
+    def _download(self, file_id):
+        lines = []
+        for line in self.uploaded:
+            custom_id = json.loads(line)["custom_id"]
+            body = {"choices": [{"message": {"content": json.dumps(self.payload)}}]}
+            lines.append(json.dumps({"custom_id": custom_id, "response": {"body": body}}))
+        return types.SimpleNamespace(text="\n".join(lines))
+
+
+def test_batch_submit_and_poll(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    evaluator = RAGEvaluator()
+    evaluator.batch_dir = str(tmp_path)
+    client = _FakeBatchClient({"context_precision": 0.7, "faithfulness": 0.9, "answer_relevancy": 0.8})
+    evaluator.openai_client = client
+    records = [
+        {"query": "q1", "response": "r1", "retrieved_docs": [{"id": "a", "content": "c", "score": 0.5}]},
+        {"query": "q2", "response": "r2", "retrieved_docs": []},
+    ]
+
+    batch_id = evaluator.submit_batch(records)
+    assert len(client.uploaded) == 2
+    assert evaluator.poll_batch(batch_id) is None  # still running
+
+    client.status = "completed"
+    results = evaluator.poll_batch(batch_id)
+    assert [r["query"] for r in results] == ["q1", "q2"]
+    assert results[0]["metrics"]["faithfulness"] == 0.9
+    assert results[1]["metrics"]["retrieval_accuracy"] == 0.0
+    assert list(evaluator.evaluation_history) == results
+    assert results[0]["metrics"]["evaluation_latency"] == 0.0 and results[0]["batch_turnaround"] >= 0.0
+    assert evaluator.poll_batch(batch_id) == results  # polling again doesn't record twice
+    assert len(evaluator.evaluation_history) == 2
+    assert json.loads(evaluator.export_evaluation_data()) == results
+
+
+def test_export_leaves_out_other_evaluators_log_entries(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    completions = _FakeCompletions({"context_precision": 0.8, "faithfulness": 0.9, "answer_relevancy": 0.7})
+    first, second = RAGEvaluator(), RAGEvaluator()
+    for evaluator in (first, second):
+        evaluator.openai_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    first.evaluate_response("other user's question", "r", [])
+    second.evaluate_response("my question", "r", [])
+
+    assert [r["query"] for r in json.loads(second.export_evaluation_data())] == ["my question"]
+    with open(config.EVAL_LOG_PATH, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2  # both stay in the server-side log
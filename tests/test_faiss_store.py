@@ -0,0 +1,114 @@
+import types
+import zlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+import config
+from modules import vector_store as vs
+
+
+class _FakeEmbeddings:
+    def create(self, model, input):
+        texts = [input] if isinstance(input, str) else input
+        data = []
+        for i, text in enumerate(texts):
+            rng = np.random.default_rng(zlib.crc32(text.encode()))
+            data.append(types.SimpleNamespace(index=i, embedding=rng.standard_normal(config.EMBEDDING_DIMENSION).tolist()))
+        return types.SimpleNamespace(data=data)
+
+
+def _empty_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FAISS_INDEX_PATH", str(tmp_path / "idx"))
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite"))
+    monkeypatch.setattr(vs, "get_openai_client", lambda: types.SimpleNamespace(embeddings=_FakeEmbeddings()))
+    monkeypatch.setattr(vs.LocalFaissStore, "_load_initial_knowledge_base", lambda self: None)
+    return vs.LocalFaissStore()
+
+
+def test_faiss_upsert_search_delete(tmp_path, monkeypatch):
+    store = _empty_store(tmp_path, monkeypatch)
+    docs = [{"id": f"d{i}", "content": f"article {i}", "category": "a" if i % 2 else "b"} for i in range(6)]
+    assert store.upsert_documents(docs)
+    assert store.similarity_search("article 3", k=1)[0]["id"] == "d3"
+    filtered = store.similarity_search("article 3", k=3, filter_dict={"category": {"$eq": "b"}})
+    assert filtered and all(d["category"] == "b" for d in filtered)
+    assert store.similarity_search("unseen query", filter_dict={"category": {"$in": ["missing"]}}) == []
+    assert store.embedding_cache.get_many(["unseen query"]) == [None]  # answered without embedding the query
+
+    assert store.delete_document("d3")
+    reloaded = vs.LocalFaissStore()
+    assert reloaded.get_index_stats()["total_vectors"] == 5
+    assert reloaded.similarity_search("article 3", k=1)[0]["id"] != "d3"
+
+
+def test_faiss_compressed_index_reranks_exactly(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FAISS_INDEX_FACTORY", "IVF4,PQ16x4")
+    monkeypatch.setattr(config, "FAISS_NPROBE", 4)
+    store = _empty_store(tmp_path, monkeypatch)
+    docs = [{"id": f"d{i}", "content": f"article {i}"} for i in range(300)]
+    assert store.upsert_documents(docs)
+    assert not isinstance(store.index, vs.faiss.IndexFlat)
+
+    results = vs.LocalFaissStore().similarity_search("article 42", k=3)
+    assert results[0]["id"] == "d42"
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_embedding_batch_round_trip(tmp_path, monkeypatch):
+    store = _empty_store(tmp_path, monkeypatch)
+    monkeypatch.setattr(vs, "EMBEDDING_BATCH_DIR", str(tmp_path / "batches"))
+    uploaded = {}
+
+    def files_create(file, purpose):
+        uploaded["lines"] = [vs.from_json(line) for line in file[1].splitlines()]
+        return types.SimpleNamespace(id="file-in")
+
+    def files_content(file_id):
+        lines = []
+        for request in uploaded["lines"]:
+            embedded = _FakeEmbeddings().create(request["body"]["model"], request["body"]["input"])
+            data = [{"index": d.index, "embedding": d.embedding} for d in reversed(embedded.data)]
+            lines.append(vs.to_json({"custom_id": request["custom_id"], "response": {"body": {"data": data}}}))
+        return types.SimpleNamespace(text="\n".join(lines))
+
+    status = {"value": "in_progress"}
+    store.openai_client = types.SimpleNamespace(
+        embeddings=None,  # every vector must come from the batch output
+        files=types.SimpleNamespace(create=files_create, content=files_content),
+        batches=types.SimpleNamespace(
+            create=lambda **kwargs: types.SimpleNamespace(id="batch-1"),
+            retrieve=lambda batch_id: types.SimpleNamespace(status=status["value"], output_file_id="file-out"),
+        ),
+    )
+    docs = [{"id": f"d{i}", "content": f"article {i % 3}"} for i in range(5)]
+    assert store.submit_embedding_batch(docs) == "batch-1"
+    assert [line["body"]["input"] for line in uploaded["lines"]] == [["article 0", "article 1", "article 2"]]
+
+    assert store.poll_embedding_batch("batch-1") is None
+    status["value"] = "completed"
+    assert store.poll_embedding_batch("batch-1") is True
+    assert store.similarity_search("article 1", k=1)[0]["id"] in {"d1", "d4"}
+    assert store.submit_embedding_batch(docs) is None  # everything is cached now
+
+
+def test_faiss_single_edits_skip_retraining(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FAISS_INDEX_FACTORY", "IVF4,PQ16x4")
+    monkeypatch.setattr(config, "FAISS_NPROBE", 4)
+    store = _empty_store(tmp_path, monkeypatch)
+    assert store.upsert_documents([{"id": f"d{i}", "content": f"article {i}"} for i in range(300)])
+    trained = store.index
+    builds = []
+    monkeypatch.setattr(store, "_build_index", lambda vectors: builds.append(len(vectors)))
+
+    assert store.upsert_documents([{"id": "d7", "content": "replacement text"}])
+    assert store.upsert_documents([{"id": "new", "content": "brand new article"}])
+    assert store.delete_document("d9")
+    assert builds == [] and store.index is trained and store.index.ntotal == 302
+
+    assert store.similarity_search("replacement text", k=1)[0]["id"] == "d7"
+    assert store.similarity_search("brand new article", k=1)[0]["id"] == "new"
+    assert all(d["id"] != "d9" for d in store.similarity_search("article 9", k=5))
+    assert store.get_index_stats()["total_vectors"] == 300
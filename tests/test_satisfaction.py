@@ -11,3 +11,13 @@ def test_satisfaction_trend():
     assert tracker.rating_trend(window=5) == "improving"
     avg = tracker.average_rating()
     assert 2.9 < avg < 3.1  # average should be around 3
+
+
+def test_satisfaction_ring_buffer_keeps_latest():
+    tracker = CustomerSatisfactionTracker(capacity=4)
+    for i, r in enumerate([1, 1, 5, 5, 5, 5]):
+        tracker.add_feedback(f"m{i}", r)
+    assert len(tracker) == 4
+    assert tracker.average_rating() == 5.0
+    assert tracker.average_rating(last_n=2) == 5.0
+    assert [f["message_id"] for f in tracker.export()] == ["m2", "m3", "m4", "m5"]
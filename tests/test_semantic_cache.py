@@ -0,0 +1,68 @@
+from modules.semantic_cache import SemanticCache
+
+_VECTORS = {
+    "refund for order 12": [1.0, 0.0, 0.0],
+    "refund for order 13": [0.99, 0.1, 0.0],
+    "password reset": [0.0, 1.0, 0.0],
+    "billing question": [0.0, 0.0, 1.0],
+}
+
+
+def test_exact_and_near_duplicate_hits():
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return _VECTORS[text]
+
+    cache = SemanticCache(embed, threshold=0.95, max_entries=2)
+    calls = []
+
+    def compute(value):
+        return lambda: calls.append(value) or {"score": value}
+
+    assert cache.get_or_compute("risk", "refund for order 12", compute(1)) == {"score": 1}
+    assert cache.get_or_compute("risk", "refund for order 12", compute(2)) == {"score": 1}
+    assert embedded.count("refund for order 12") == 1  # exact hit skips embedding
+    assert cache.get_or_compute("risk", "refund for order 13", compute(3)) == {"score": 1}
+    assert cache.get_or_compute("other", "refund for order 13", compute(4)) == {"score": 4}
+    assert calls == [1, 4]
+
+    # Capacity 2: adding a third prompt evicts the least recently used ("risk" entry)
+    cache.get_or_compute("risk", "password reset", compute(5))
+    assert cache.get_or_compute("risk", "refund for order 12", compute(6)) == {"score": 6}
+    assert cache.get_or_compute("risk", "billing question", compute(7)) == {"score": 7}
+    assert calls == [1, 4, 5, 6, 7]
+
+
+def test_exact_only_without_embedder():
+    cache = SemanticCache(None, max_entries=4)
+    assert cache.get("response", "hello") is None
+    cache.put("response", "hello", "hi there")
+    assert cache.get("response", "hello") == "hi there"
+    assert cache.get("escalation", "hello") is None
+    assert cache.get_or_compute("response", "hello!", lambda: "computed") == "computed"
+
+
+def test_shared_store_tier():
+    class Store:
+        def __init__(self):
+            self.entries = {}
+
+        def semantic_cache_lookup(self, embedding, namespace, threshold):
+            return next((value for (ns, _), (vector, value) in self.entries.items()
+                         if ns == namespace and float(vector @ embedding) >= threshold), None)
+
+        def semantic_cache_store(self, key, embedding, namespace, result):
+            self.entries[(namespace, key)] = (embedding, result)
+
+    store = Store()
+    first = SemanticCache(lambda text: _VECTORS[text], threshold=0.95, shared_store=store)
+    assert first.get_or_compute("sentiment", "refund for order 12", lambda: {"score": 1}) == {"score": 1}
+
+    # A fresh process misses locally but finds the near-duplicate in the shared store
+    second = SemanticCache(lambda text: _VECTORS[text], threshold=0.95, shared_store=store)
+    assert second.get_or_compute("sentiment", "refund for order 13", lambda: {"score": 2}) == {"score": 1}
+    assert second.get_or_compute("sentiment", "refund for order 13", lambda: {"score": 3}) == {"score": 1}
+    assert second.get_or_compute("sentiment", "password reset", lambda: {"score": 4}) == {"score": 4}
+    assert len(store.entries) == 2
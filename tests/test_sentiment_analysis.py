@@ -0,0 +1,54 @@
+import json
+from types import SimpleNamespace
+
+from modules.semantic_cache import SemanticCache
+from modules.sentiment_analysis import SentimentAnalyzer
+
+
+def test_clear_cut_triggers_skip_model(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    analyzer = SentimentAnalyzer()
+    analyzer.semantic_cache = None
+    calls = []
+    reply = SimpleNamespace(message=SimpleNamespace(content='{"escalation_likelihood": 0.6, "severity": "medium"}'))
+    create = lambda **kwargs: calls.append(kwargs) or SimpleNamespace(choices=[reply])
+    analyzer.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    low = analyzer.detect_escalation_triggers("Can I get a refund?")
+    assert (low["escalation_likelihood"], low["severity"], calls) == (0.2, "low", [])
+    high = analyzer.detect_escalation_triggers("This is FRAUD, my attorney will call")
+    assert (high["triggers_found"], high["severity"], calls) == (["attorney", "fraud"], "critical", [])
+
+    ambiguous = analyzer.detect_escalation_triggers("Get me your manager")
+    assert ambiguous["escalation_likelihood"] == 0.6
+    assert len(calls) == 1
+
+
+def test_sentiment_batch_shares_requests(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    analyzer = SentimentAnalyzer()
+    analyzer.semantic_cache = SemanticCache(None)
+    requests = []
+
+    def create(**kwargs):
+        content = kwargs["messages"][-1]["content"]
+        if not content.startswith("{"):  # single-message prompt
+            requests.append(None)
+            result = {"sentiment_score": 0.9}
+        else:
+            messages = json.loads(content)["messages"]
+            requests.append(messages)
+            result = {"analyses": [{"sentiment_score": 0.1 * len(text)} for text in messages[:-1]]}  # last one left out
+        reply = SimpleNamespace(message=SimpleNamespace(content=json.dumps(result)))
+        return SimpleNamespace(choices=[reply])
+
+    analyzer.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    texts = ["a" * (i % 9 + 1) for i in range(12)]  # 9 distinct messages: one full batch plus one
+    results = analyzer.analyze_sentiment_batch(texts)
+
+    assert [len(r) for r in requests[:2]] == [8, 1]
+    assert requests[2:] == [None, None]  # the two messages the replies left out
+    assert results[1]["sentiment_score"] == 0.2 and results[1]["sentiment_label"] == "negative"
+    assert results[10] == results[1]
+    assert results[8]["sentiment_score"] == 0.9
+    assert analyzer.semantic_cache.get("sentiment", "aa") == {"sentiment_score": 0.2}
@@ -1,16 +1,52 @@
+import functools
+import importlib.util
+import json
+import math
+import threading
 import time
+from bisect import bisect_right
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
+import httpx
+from openai import DefaultHttpxClient, OpenAI
 import streamlit as st
+import config
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional faster JSON encoder
+    orjson = None
+
+try:
+    import tiktoken  # type: ignore
+except ImportError:  # optional; token limits fall back to a characters-per-token estimate
+    tiktoken = None
+
+# Score band lower bounds (after the first) and the emoji for each band
+SENTIMENT_EMOJI_BOUNDS = (0.2, 0.4, 0.6, 0.8)
+SENTIMENT_EMOJIS = ("😡", "😞", "😐", "🙂", "😊")
+URGENCY_EMOJI_BOUNDS = (0.3, 0.6)
+URGENCY_EMOJIS = ("🟢", "🟡", "🔴")  # low, medium, high urgency
+
+@functools.lru_cache(maxsize=8192)
+def _timestamp_strings(seconds: int) -> Tuple[str, str]:
+    """Full date-time and HH:MM strings for a whole-second timestamp, from one datetime"""
+    dt = datetime.fromtimestamp(seconds)
+    return dt.strftime("%Y-%m-%d %H:%M:%S"), dt.strftime("%H:%M")
 
 def format_timestamp(timestamp: float) -> str:
     """Format timestamp to readable string"""
     try:
-        dt = datetime.fromtimestamp(timestamp)
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
+        return _timestamp_strings(int(timestamp))[0]
     except:
         return "Unknown"
 
+def unit_score(value: Any, default: float) -> float:
+    """Model-reported score clamped into [0, 1]; non-numeric values fall back to ``default``"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+        return default
+    return max(0.0, min(1.0, float(value)))
+
 def calculate_response_time(start_time: float, end_time: float) -> float:
     """Calculate response time in seconds"""
     return max(0.0, end_time - start_time)
@@ -21,63 +57,136 @@ def truncate_text(text: str, max_length: int = 100) -> str:
         return text
     return text[:max_length-3] + "..."
 
+def from_json(data: str | bytes) -> Any:
+    """Parse JSON text, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@functools.lru_cache(maxsize=1)
+def get_openai_client() -> OpenAI:
+    """Process-wide OpenAI client so every component reuses one warm connection pool"""
+    return OpenAI(
+        api_key=config.OPENAI_API_KEY,
+        timeout=config.OPENAI_TIMEOUT,
+        max_retries=config.OPENAI_MAX_RETRIES,
+        http_client=DefaultHttpxClient(
+            http2=importlib.util.find_spec("h2") is not None,  # HTTP/2 needs the optional h2 package
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    )
+
+# Last OpenAI reachability probe, shared because every component uses the same client
+_ping_lock = threading.Lock()
+_ping_state: Dict[str, Any] = {"result": None, "last_ok": 0.0, "pending": False}
+
+def _ping_openai():
+    try:
+        get_openai_client().with_options(max_retries=0).models.list()
+        ok = True
+    except Exception:
+        ok = False
+    with _ping_lock:
+        _ping_state["result"] = ok
+        if ok:
+            _ping_state["last_ok"] = time.time()
+        _ping_state["pending"] = False
+
+def openai_reachable(max_age: float = 60.0) -> bool:
+    """Whether the OpenAI API answered recently; stale results are refreshed in the background"""
+    if not config.OPENAI_API_KEY:
+        return False
+    with _ping_lock:
+        if time.time() - _ping_state["last_ok"] < max_age:
+            return True
+        first = _ping_state["result"] is None
+        refresh = not first and not _ping_state["pending"]
+        if refresh:
+            _ping_state["pending"] = True
+    if first:
+        _ping_openai()  # nothing to report yet, so the very first probe is synchronous
+    elif refresh:
+        threading.Thread(target=_ping_openai, daemon=True).start()
+    return bool(_ping_state["result"])
+
+@functools.lru_cache(maxsize=1)
+def _token_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")  # gpt-4o family
+    except Exception:
+        return None  # e.g. encoding files not downloadable
+
+@functools.lru_cache(maxsize=512)
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Cut text at a token boundary, keeping its start (or its end with keep_end); about 4 characters per token without tiktoken"""
+    encoding = _token_encoding()
+    if encoding is None:
+        if len(text) <= max_tokens * 4:
+            return text
+        return text[-max_tokens * 4:] if keep_end else text[:max_tokens * 4]
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
+
 def format_conversation_for_display(conversation_history: List[Dict]) -> List[Dict]:
-    """Format conversation history for display"""
+    """Format conversation history for display.
+
+    Messages are complete once appended, so each one's display dict is built
+    once and kept on the message under "_display"; reruns only format new messages.
+    """
     formatted = []
+    now = time.time()
     
     for msg in conversation_history:
-        formatted_msg = {
-            "sender": msg["sender"],
-            "content": msg["content"],
-            "timestamp": format_timestamp(msg.get("timestamp", time.time())),
-            "display_time": datetime.fromtimestamp(msg.get("timestamp", time.time())).strftime("%H:%M")
-        }
-        
-        # Add metadata for customer messages
-        if msg["sender"] == "customer":
-            if "sentiment_score" in msg:
-                formatted_msg["sentiment"] = {
-                    "score": msg["sentiment_score"],
-                    "label": msg.get("sentiment_label", "neutral"),
-                    "emotion": msg.get("primary_emotion", "neutral")
-                }
-            
-            if "escalation_risk" in msg:
-                formatted_msg["escalation_risk"] = msg["escalation_risk"]
+        display = msg.get("_display")
+        if display is None:
+            display = msg["_display"] = _format_message(msg, now)
+        formatted.append(display)
+    
+    return formatted
+
+def _format_message(msg: Dict, now: float) -> Dict:
+    """Display-ready dict for one conversation message"""
+    full_time, display_time = _timestamp_strings(int(msg.get("timestamp", now)))
+    formatted_msg = {
+        "sender": msg["sender"],
+        "content": msg["content"],
+        "timestamp": full_time,
+        "display_time": display_time
+    }
+    
+    # Add metadata for customer messages
+    if msg["sender"] == "customer":
+        if "sentiment_score" in msg:
+            formatted_msg["sentiment"] = {
+                "score": msg["sentiment_score"],
+                "label": msg.get("sentiment_label", "neutral"),
+                "emotion": msg.get("primary_emotion", "neutral")
+            }
         
-        # Add metadata for agent messages
-        elif msg["sender"] == "agent":
-            if "response_time" in msg:
-                formatted_msg["response_time"] = f"{msg['response_time']:.2f}s"
-            
-            if "tone" in msg:
-                formatted_msg["tone"] = msg["tone"]
+        if "escalation_risk" in msg:
+            formatted_msg["escalation_risk"] = msg["escalation_risk"]
+    
+    # Add metadata for agent messages
+    elif msg["sender"] == "agent":
+        if "response_time" in msg:
+            formatted_msg["response_time"] = f"{msg['response_time']:.2f}s"
         
-        formatted.append(formatted_msg)
+        if "tone" in msg:
+            formatted_msg["tone"] = msg["tone"]
     
-    return formatted
+    return formatted_msg
 
 def get_sentiment_emoji(sentiment_score: float) -> str:
     """Get emoji based on sentiment score"""
-    if sentiment_score < 0.2:
-        return "😡"
-    elif sentiment_score < 0.4:
-        return "😞"
-    elif sentiment_score < 0.6:
-        return "😐"
-    elif sentiment_score < 0.8:
-        return "🙂"
-    else:
-        return "😊"
+    return SENTIMENT_EMOJIS[bisect_right(SENTIMENT_EMOJI_BOUNDS, sentiment_score)]
 
 def get_urgency_emoji(urgency_score: float) -> str:
     """Get emoji based on urgency score"""
-    if urgency_score < 0.3:
-        return "🟢"  # Low urgency
-    elif urgency_score < 0.6:
-        return "🟡"  # Medium urgency
-    else:
-        return "🔴"  # High urgency
+    return URGENCY_EMOJIS[bisect_right(URGENCY_EMOJI_BOUNDS, urgency_score)]
 
 def format_metric_delta(current: float, previous: float) -> str:
     """Format metric delta for display"""
@@ -118,6 +227,22 @@ def create_download_link(data: str, filename: str, link_text: str) -> str:
     href = f'<a href="data:file/txt;base64,{b64}" download="{filename}">{link_text}</a>'
     return href
 
+def to_json_bytes(data: Any, indent: bool = False) -> bytes:
+    """Serialize data to UTF-8 JSON bytes for writing to binary files, using orjson when it is installed"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            pass  # types orjson can't encode; let json raise or handle them
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+def to_json(data: Any, indent: bool = False) -> str:
+    """Serialize data for export, using orjson when it is installed"""
+    return to_json_bytes(data, indent).decode('utf-8')
+
 def safe_divide(numerator: float, denominator: float, default: float = 0.0) -> float:
     """Safely divide two numbers, returning default if denominator is zero"""
     try:
@@ -130,43 +255,54 @@ def calculate_conversation_metrics(conversation_history: List[Dict]) -> Dict[str
     if not conversation_history:
         return {}
     
-    customer_messages = [msg for msg in conversation_history if msg["sender"] == "customer"]
-    agent_messages = [msg for msg in conversation_history if msg["sender"] == "agent"]
+    # One pass over the history accumulates every aggregate
+    now = time.time()
+    n_customer = n_agent = n_scores = escalation_count = response_count = 0
+    response_total = 0.0
+    first_score = last_score = None
+    first_time = last_time = None
+    for msg in conversation_history:
+        timestamp = msg.get("timestamp", now)
+        if first_time is None or timestamp < first_time:
+            first_time = timestamp
+        if last_time is None or timestamp > last_time:
+            last_time = timestamp
+        
+        sender = msg["sender"]
+        if sender == "customer":
+            n_customer += 1
+            if "sentiment_score" in msg:
+                last_score = msg["sentiment_score"]
+                if first_score is None:
+                    first_score = last_score
+                n_scores += 1
+            if msg.get("escalation_risk", 0) > 0.6:
+                escalation_count += 1
+        elif sender == "agent":
+            n_agent += 1
+            if "response_time" in msg:
+                response_total += msg["response_time"]
+                response_count += 1
     
     metrics = {
         "total_messages": len(conversation_history),
-        "customer_messages": len(customer_messages),
-        "agent_messages": len(agent_messages),
-        "conversation_duration": 0,
-        "avg_response_time": 0,
+        "customer_messages": n_customer,
+        "agent_messages": n_agent,
+        "conversation_duration": last_time - first_time,
+        "avg_response_time": response_total / response_count if response_count else 0,
         "sentiment_trend": "neutral",
-        "escalation_count": 0
+        "escalation_count": escalation_count
     }
     
-    # Calculate conversation duration
-    if conversation_history:
-        start_time = min(msg.get("timestamp", time.time()) for msg in conversation_history)
-        end_time = max(msg.get("timestamp", time.time()) for msg in conversation_history)
-        metrics["conversation_duration"] = end_time - start_time
-    
-    # Calculate average response time
-    response_times = [msg.get("response_time", 0) for msg in agent_messages if "response_time" in msg]
-    if response_times:
-        metrics["avg_response_time"] = sum(response_times) / len(response_times)
-    
     # Analyze sentiment trend
-    sentiment_scores = [msg.get("sentiment_score", 0.5) for msg in customer_messages if "sentiment_score" in msg]
-    if len(sentiment_scores) >= 2:
-        if sentiment_scores[-1] > sentiment_scores[0] + 0.1:
+    if n_scores >= 2:
+        if last_score > first_score + 0.1:
             metrics["sentiment_trend"] = "improving"
-        elif sentiment_scores[-1] < sentiment_scores[0] - 0.1:
+        elif last_score < first_score - 0.1:
             metrics["sentiment_trend"] = "deteriorating"
         else:
             metrics["sentiment_trend"] = "stable"
     
-    # Count escalation alerts
-    metrics["escalation_count"] = sum(1 for msg in customer_messages if msg.get("escalation_risk", 0) > 0.6)
-    
     return metrics
 
 def format_duration(seconds: float) -> str: